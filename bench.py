@@ -0,0 +1,306 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file measures the speed of the hot paths of the game.
+# Each benchmark runs a function on a board (the default boards, and
+# square boards of 100x100 and 1000x1000) for some time, and gives the
+# number of operations per second and the memory allocated by one operation.
+# The results are saved to a JSON file, that can be given back with
+# --baseline to compare two runs and find the benchmarks that got slower.
+# With --memory, the memory taken by a game kept in memory is also measured,
+# for every board of board_shapes/ and every engine.
+#
+# e.g. : py bench.py --output before.json
+#        py bench.py --baseline before.json --output after.json
+#        py bench.py --memory --filter turns
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from glob import glob
+from random import Random
+
+from block_catalog import catalog
+from board import (read_grid, get_block_list, valid_position, place_bloc,
+                   clear_rows_and_col, make_bloc_fall, print_grid, make_board, engines)
+from board_cache import load_board
+from engine import GameState
+from moves import legal_origins
+
+# Boards used by default : the path of the file, or the size of a square board
+default_boards = {
+    "circle": "board_shapes/circle.txt",
+    "diamond": "board_shapes/diamond.txt",
+    "triangle": "board_shapes/triangle.txt",
+    "square100": 100,
+    "square1000": 1000,
+}
+
+# Return the path of a board, writing square boards to a temporary file
+def board_path(board) -> str:
+    if isinstance(board, str):
+        return board
+
+    path = os.path.join(tempfile.gettempdir(), f"tetris_bench_square{board}.txt")
+    if not os.path.isfile(path):
+        with open(path, 'w') as file:
+            for _ in range(board):
+                file.write(" ".join('1' * board) + "\n")
+
+    return path
+
+# Return a location in the middle of a board where the block "bloc" fits
+def middle_move(grid, bloc) -> tuple:
+    nb_row, nb_col = len(grid), len(grid[0])
+    for y in list(range(nb_row//2, nb_row)) + list(range(nb_row//2)):
+        for x in list(range(nb_col//2, nb_col)) + list(range(nb_col//2)):
+            if valid_position(grid, catalog[bloc], x, y):
+                return x, y
+
+    return 0, nb_row-1
+
+# Play a random move of the hand, without going through every possible move
+def quick_move(state, rng) -> tuple:
+    free = state.board.free_rows()
+    for bloc in rng.sample(state.hand(), len(state.hand())):
+        origins = legal_origins(free, bloc)
+        rows = [y for y, mask in enumerate(origins) if mask]
+        if rows:
+            y = rng.choice(rows)
+            mask = origins[y]
+            xs = [x for x in range(mask.bit_length()) if mask >> x & 1]
+            return bloc, rng.choice(xs), y
+
+    return None
+
+# Benchmarks, by name
+# Each one is a function taking the path of a board and returning
+# a tuple (function to measure, number of operations done by one call)
+def bench_valid_position(path):
+    grid = read_grid(path)
+    x, y = middle_move(grid, 21)
+    return (lambda: valid_position(grid, catalog[21], x, y)), 1
+
+def bench_place_bloc(path):
+    grid = read_grid(path)
+    x, y = middle_move(grid, 21)
+    return (lambda: place_bloc(grid, catalog[21], x, y)), 1
+
+def bench_clear_nothing(path):
+    grid = read_grid(path)
+    return (lambda: clear_rows_and_col(grid)), 1
+
+def bench_clear_lines(path):
+    grid = read_grid(path)
+    i, j = len(grid) // 2, len(grid[0]) // 2
+
+    # Fill a row and a column, then clear them
+    def run():
+        for c in range(len(grid[i])):
+            if grid[i][c] != '0':
+                grid[i][c] = '2'
+        for line in grid:
+            if line[j] != '0':
+                line[j] = '2'
+        clear_rows_and_col(grid)
+
+    return run, 1
+
+def bench_make_bloc_fall(path):
+    grid = read_grid(path)
+    return (lambda: make_bloc_fall(grid, len(grid) // 2)), 1
+
+def bench_read_grid(path):
+    return (lambda: read_grid(path)), 1
+
+def bench_print_grid(path):
+    grid = read_grid(path)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            print_grid(grid)
+
+    return run, 1
+
+# Play 100 turns of a game, starting a new one when it is over
+def turns_benchmark(engine):
+    def bench(path):
+        grid = read_grid(path)
+        bloc_list = get_block_list(path)
+        rng = Random(0)
+        games = [GameState(make_board([line[:] for line in grid], engine), bloc_list, 2, 0, engine)]
+
+        def run():
+            for _ in range(100):
+                state = games[0]
+                move = quick_move(state, rng)
+                if move is None:
+                    games[0] = GameState([line[:] for line in grid], bloc_list, 2, rng.randrange(1 << 32), engine)
+                    continue
+                state.play(*move)
+
+        return run, 100
+
+    return bench
+
+benchmarks = {
+    "valid_position": bench_valid_position,
+    "place_bloc": bench_place_bloc,
+    "clear_rows_and_col": bench_clear_nothing,
+    "clear_rows_and_col_lines": bench_clear_lines,
+    "make_bloc_fall": bench_make_bloc_fall,
+    "read_grid": bench_read_grid,
+    "print_grid": bench_print_grid,
+}
+for name in engines:
+    benchmarks[f"turns_{name}"] = turns_benchmark(name)
+
+# Measure a function : run it for at least "min_time" seconds, then run it
+# once more while tracing the memory allocations
+# Return a dictionary with the number of operations per second, and the
+# bytes and blocks of memory allocated by one operation
+def measure(run, ops, min_time) -> dict:
+    run()
+
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        run()
+        calls += 1
+        elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+
+    return {
+        "ops_per_sec": calls * ops / elapsed,
+        "alloc_bytes": peak / ops,
+        "alloc_blocks": blocks / ops,
+    }
+
+# Measure the memory taken by "count" games played on a board, after a few turns
+# What is shared by the games (the board file, the blocks) is loaded before
+# Return a dictionary with the bytes taken by one game, and the size of a
+# game saved with GameState.to_bytes
+def measure_games(path, engine, count=200, turns=5) -> dict:
+    data = load_board(path)
+    bloc_list = get_block_list(path)
+
+    def play(seed):
+        rng = Random(seed)
+        state = GameState(data, bloc_list, 2, seed, engine)
+        for _ in range(turns):
+            move = quick_move(state, rng)
+            if move is None:
+                break
+            state.play(*move)
+        state.is_over()
+        return state
+
+    play(0)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = [play(seed) for seed in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return {
+        "bytes_per_game": (after - before) / count,
+        "saved_bytes": len(games[0].to_bytes()),
+    }
+
+# Compare the results of this run with the ones of a baseline
+# A benchmark is a regression if it is slower by more than "threshold" (0.1 = 10%)
+# Return the list of the names of the regressions
+def compare(results, baseline, threshold) -> list:
+    regressions = []
+    print(f"\n{'BENCHMARK':<46}{'BASELINE':>14}{'NOW':>14}{'CHANGE':>10}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]["ops_per_sec"]
+        new = result["ops_per_sec"]
+        change = new / old - 1
+        flag = ""
+        if change < -threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<46}{old:>14.1f}{new:>14.1f}{change:>+10.1%}{flag}")
+
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure the speed of the hot paths of the game.")
+    parser.add_argument("--boards", nargs="+", choices=list(default_boards), default=list(default_boards))
+    parser.add_argument("--filter", default="", help="only run the benchmarks containing this text")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds spent on each benchmark")
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--baseline", default=None, help="results of an older run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown flagged as a regression")
+    parser.add_argument("--memory", action="store_true", help="measure the memory taken by a game")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'BENCHMARK':<46}{'OPS/SEC':>14}{'BYTES/OP':>12}{'BLOCKS/OP':>12}")
+    for board in args.boards:
+        path = board_path(default_boards[board])
+        for name, bench in benchmarks.items():
+            full_name = f"{name}[{board}]"
+            if args.filter not in full_name:
+                continue
+
+            run, ops = bench(path)
+            result = measure(run, ops, args.min_time)
+            results[full_name] = result
+            print(f"{full_name:<46}{result['ops_per_sec']:>14.1f}"
+                  f"{result['alloc_bytes']:>12.0f}{result['alloc_blocks']:>12.1f}")
+
+    memory = {}
+    if args.memory:
+        print(f"\n{'GAME':<46}{'BYTES/GAME':>14}{'SAVED BYTES':>14}")
+        for path in sorted(glob("board_shapes/*.txt")):
+            for engine in engines:
+                name = f"{engine}[{os.path.splitext(os.path.basename(path))[0]}]"
+                memory[name] = measure_games(path, engine)
+                print(f"{name:<46}{memory[name]['bytes_per_game']:>14.0f}{memory[name]['saved_bytes']:>14}")
+
+    with open(args.output, 'w') as file:
+        json.dump({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "results": results,
+            "memory": memory,
+        }, file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) found.")
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
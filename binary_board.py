@@ -0,0 +1,125 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the binary format of the boards and saves (.tlb files).
+# A binary board is made of :
+#   - a 16 bytes header : the "TLB1" magic number, then the number of rows,
+#     the number of columns and the number of bytes per row, as 32-bit
+#     little-endian integers
+#   - the "playable" bit plane : for each row, the bit j is set if the cell
+#     in column j is not a '0'
+#   - the "filled" bit plane : for each row, the bit j is set if the cell
+#     in column j is a '2'
+# Each row of a plane is a little-endian integer, just like the rows of a
+# bitboard, so a binary board is memory-mapped and turned into a bitboard
+# without reading any cell one by one.
+#
+# e.g. : py binary_board.py to-bin board_shapes/circle.txt board_shapes/circle.tlb
+#        py binary_board.py to-txt save.tlb save.txt
+
+import mmap
+import struct
+import sys
+
+from bitboard import BitBoard
+
+MAGIC = b"TLB1"
+HEADER = struct.Struct("<4sIII")
+
+# Check if a file is a binary board
+# Return True if the file starts with the magic number, False otherwise
+def is_binary(path) -> bool:
+    try:
+        with open(path, 'rb') as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+# Memory-map a binary board and read its header
+# Return a tuple (mmap, nb_row, nb_col, row_bytes)
+def map_binary(path) -> tuple:
+    with open(path, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(data) < HEADER.size:
+        data.close()
+        raise ValueError(f"{path} is not a valid binary board.")
+
+    magic, nb_row, nb_col, row_bytes = HEADER.unpack_from(data)
+    if magic != MAGIC or len(data) < HEADER.size + 2 * nb_row * row_bytes:
+        data.close()
+        raise ValueError(f"{path} is not a valid binary board.")
+
+    return data, nb_row, nb_col, row_bytes
+
+# Read the two bit planes of a binary board
+# Return a tuple (nb_col, playable, filled), the planes being lists of bitmasks
+def read_planes(path) -> tuple:
+    data, nb_row, nb_col, row_bytes = map_binary(path)
+
+    planes = []
+    start = HEADER.size
+    for _ in range(2):
+        plane = []
+        for _ in range(nb_row):
+            plane.append(int.from_bytes(data[start:start+row_bytes], 'little'))
+            start += row_bytes
+        planes.append(plane)
+
+    data.close()
+    return nb_col, planes[0], planes[1]
+
+# Open a binary board as a bitboard
+# Return the bitboard
+def open_binary(path) -> BitBoard:
+    nb_col, playable, filled = read_planes(path)
+    return BitBoard.from_rows(nb_col, playable, filled)
+
+# Read a binary board as a 2D matrix of the board, like read_grid
+# Return the 2D matrix
+def read_binary_grid(path) -> list:
+    return open_binary(path).to_grid()
+
+# Write a board to a binary file
+# "board" is a 2D matrix of the board or a bitboard
+def write_binary(path, board) -> None:
+    if not isinstance(board, BitBoard):
+        board = BitBoard(board)
+
+    row_bytes = (board.nb_col + 7) // 8
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, board.nb_row, board.nb_col, row_bytes))
+        for plane in (board.playable, board.filled):
+            file.write(b"".join(row.to_bytes(row_bytes, 'little') for row in plane))
+
+# Write a 2D matrix of the board to a text file, in the same format as the default boards
+def write_text(path, grid) -> None:
+    with open(path, 'w') as file:
+        for line in grid:
+            file.write(" ".join(line) + "\n")
+
+def main() -> int:
+    if len(sys.argv) != 4 or sys.argv[1] not in ("to-bin", "to-txt"):
+        print("Usage : py binary_board.py [to-bin|to-txt] <source> <destination>")
+        return 1
+
+    from board import read_grid
+
+    grid = read_grid(sys.argv[2])
+    if grid == []:
+        return 1
+
+    if sys.argv[1] == "to-bin":
+        write_binary(sys.argv[3], grid)
+    else:
+        write_text(sys.argv[3], grid)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the bitboard engine of the game.
+# Every row of the board is stored as two integers used as bitmasks :
+#   - "playable" has the bit j set if the cell in column j is not a '0'
+#   - "filled" has the bit j set if the cell in column j is a '2'
+# Checking if a block fits, placing it and finding the full lines
+# then only takes a few AND/OR/shift operations per row.
+
+from block_catalog import catalog
+from board_cache import compile_board
+from zobrist import zobrist_keys, xor_row
+
+class BitBoard:
+    # Create a bitboard from a 2D matrix of the board
+    def __init__(self, grid):
+        data = compile_board(grid)
+        self.setup(data.nb_col, data.playable, data.filled, data.row_capacity, data.col_capacity)
+
+    # Create a bitboard directly from the bitmasks of its rows
+    # Return the bitboard
+    @classmethod
+    def from_rows(cls, nb_col, playable, filled):
+        board = cls.__new__(cls)
+        board.setup(nb_col, playable, filled)
+        return board
+
+    # Create a bitboard from the data of a board file (see board_cache.py)
+    # Return the bitboard
+    @classmethod
+    def from_data(cls, data):
+        board = cls.__new__(cls)
+        board.setup(data.nb_col, data.playable, data.filled[:], data.row_capacity, data.col_capacity)
+        return board
+
+    # Set every attribute of the bitboard from the bitmasks of its rows
+    # The capacities of the lines are computed if they aren't given
+    def setup(self, nb_col, playable, filled, row_capacity=None, col_capacity=None) -> None:
+        self.nb_row = len(playable)
+        self.nb_col = nb_col
+        self.full_mask = (1 << self.nb_col) - 1
+
+        self.playable = playable
+        self.filled = filled
+
+        # Number of playable cells in each row and column,
+        # that is the number of points given when the line is cleared
+        self.row_capacity = row_capacity
+        if row_capacity is None:
+            self.row_capacity = [p.bit_count() for p in self.playable]
+
+        # The columns are read from the binary representation of the rows
+        # ("bits[i][-1-j]" is the bit j of the row i)
+        self.col_capacity = col_capacity
+        if col_capacity is None:
+            bits = [format(p, f"0{self.nb_col}b") for p in self.playable]
+            self.col_capacity = [column.count('1') for column in zip(*bits)][::-1]
+
+        # Number of lines cleared since the board was created
+        self.cleared = 0
+
+        # Mask of the columns containing at least one playable cell
+        self.playable_cols = 0
+        for p in self.playable:
+            self.playable_cols |= p
+
+        # Zobrist hash of the filled cells, kept up to date by every method
+        self.keys = zobrist_keys(self.nb_row, self.nb_col)
+        self.hash = 0
+        for r in range(self.nb_row):
+            self.hash = xor_row(self.hash, self.keys[r], self.filled[r])
+
+    # Return the key of the board : boards of the same size with the same
+    # filled cells have the same key
+    def key(self) -> int:
+        return self.hash
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        if not isinstance(other, BitBoard):
+            return NotImplemented
+        return (self.hash == other.hash and self.playable == other.playable
+                and self.filled == other.filled)
+
+    # Return a copy of the bitboard
+    # Only the filled cells are copied, the other attributes never change
+    def copy(self):
+        board = BitBoard.__new__(BitBoard)
+        board.__dict__.update(self.__dict__)
+        board.filled = self.filled[:]
+        return board
+
+    # Convert the bitboard back to a 2D matrix of the board
+    # The playable cells of a row are written at once from its bitmask,
+    # then only the filled cells are changed one by one
+    def to_grid(self) -> list:
+        grid = []
+        for p, f in zip(self.playable, self.filled):
+            line = list(format(p, f"0{self.nb_col}b")[::-1]) if self.nb_col else []
+            while f:
+                low = f & -f
+                line[low.bit_length()-1] = '2'
+                f ^= low
+            grid.append(line)
+
+        return grid
+
+    # Return a list containing, for every row, the bitmask of its free cells
+    def free_rows(self) -> list:
+        return [p & ~f for p, f in zip(self.playable, self.filled)]
+
+    # Check if the block at index "bloc" can be placed at an (x,y) location
+    # (x,y) refers to the bottom-left corner of the block
+    # Return True if the block can be placed, False otherwise
+    def valid_position(self, bloc, x, y) -> bool:
+        if x < 0 or y < 0 or x >= self.nb_col or y >= self.nb_row:
+            return False
+
+        for dy, mask in catalog[bloc].masks:
+            r = y - dy
+            if r < 0:
+                return False
+
+            # Bits outside of the board are never free, so this also
+            # rejects blocks going past the right border
+            if (mask << x) & ~(self.playable[r] & ~self.filled[r]):
+                return False
+
+        return True
+
+    # Place the block at index "bloc" at an (x,y) location
+    # NOTE: The position must have been checked with valid_position
+    def place_bloc(self, bloc, x, y) -> None:
+        for dy, mask in catalog[bloc].masks:
+            self.filled[y-dy] |= mask << x
+            self.hash = xor_row(self.hash, self.keys[y-dy], mask << x)
+
+    # Make the rows above the row at index i fall down 1 row
+    # A cell only falls if the cell under it is playable
+    def make_bloc_fall(self, i) -> None:
+        for r in range(i, -1, -1):
+            new = self.filled[r-1] & self.playable[r] if r > 0 else 0
+            self.hash = xor_row(self.hash, self.keys[r], self.filled[r] ^ new)
+            self.filled[r] = new
+
+    # Check if any row and column are completed. If it is the case, clear them
+    # A line without any playable cell is never completed
+    # Return the score gained
+    def clear_rows_and_col(self) -> int:
+        score = 0
+        free_cols = 0
+        full_rows = []
+        for r in range(self.nb_row):
+            free = self.playable[r] & ~self.filled[r]
+            free_cols |= free
+            if free == 0 and self.playable[r]:
+                full_rows.append(r)
+
+        full_cols = self.playable_cols & ~free_cols
+        self.cleared += len(full_rows) + full_cols.bit_count()
+
+        for r in full_rows:
+            self.make_bloc_fall(r)
+            score += self.row_capacity[r]
+
+        if full_cols:
+            for r in range(self.nb_row):
+                self.hash = xor_row(self.hash, self.keys[r], self.filled[r] & full_cols)
+                self.filled[r] &= ~full_cols
+            for j in range(self.nb_col):
+                if full_cols >> j & 1:
+                    score += self.col_capacity[j]
+
+        return score
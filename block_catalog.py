@@ -0,0 +1,98 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file compiles the blocks of "block_list" to compact records.
+# "block_list" stays the reference : the records are built from it when the
+# game starts, and the engines only go through the occupied cells of a block.
+# Blocks loaded from files (see block_sets.py) are added at the end of the
+# catalog with register_bloc, unless the same shape is already in it.
+
+from typing import NamedTuple
+
+from block_general import block_list
+
+# A compiled block
+#   - "cells" : (dy, dx) offsets of every cell of the block, relative to its
+#               bottom-left corner, "dy" going up and "dx" going right
+#   - "width", "height" : size of the smallest rectangle containing the block
+#   - "size" : number of cells of the block
+#   - "masks" : (dy, mask) for every row of the block containing a cell, the
+#               bit j of "mask" being set if the block has a cell at dx = j
+#   - "lines" : the 5 lines used to print the block
+class CompiledBloc(NamedTuple):
+    cells: tuple
+    width: int
+    height: int
+    size: int
+    masks: tuple
+    lines: tuple
+
+# Compile a block given as a 5x5 matrix anchored at the bottom-left
+# Return the compiled block
+def compile_bloc(bloc) -> CompiledBloc:
+    cells = []
+    masks = []
+    lines = []
+    for i in range(5):
+        mask = 0
+        line = ""
+        for j in range(5):
+            if bloc[i][j] != 0:
+                cells.append((4-i, j))
+                mask |= 1 << j
+                line += "■ "
+            else:
+                line += "  "
+        if mask:
+            masks.append((4-i, mask))
+        lines.append(line)
+
+    width = max(dx for dy, dx in cells) + 1 if cells else 0
+    height = max(dy for dy, dx in cells) + 1 if cells else 0
+
+    return CompiledBloc(tuple(cells), width, height, len(cells), tuple(masks), tuple(lines))
+
+# Compile every block of a list of 5x5 matrices
+# Return a list of compiled blocks, in the same order
+def compile_blocks(blocks) -> list:
+    return [compile_bloc(bloc) for bloc in blocks]
+
+# Return the canonical form of the cells of a block : the sorted (dy, dx)
+# offsets, moved so that the lowest cell has dy = 0 and the leftmost dx = 0
+# Two blocks with the same shape have the same canonical form
+def canonical_cells(cells) -> tuple:
+    low = min(dy for dy, dx in cells)
+    left = min(dx for dy, dx in cells)
+    return tuple(sorted((dy-low, dx-left) for dy, dx in cells))
+
+# Add a block to the catalog, given by the (dy, dx) offsets of its cells
+# If a block of the same shape is already in the catalog, it is used instead
+# Return the index of the block in the catalog
+def register_bloc(cells) -> int:
+    cells = canonical_cells(cells)
+    if cells in index_by_cells:
+        return index_by_cells[cells]
+
+    if max(dy for dy, dx in cells) >= 5 or max(dx for dy, dx in cells) >= 5:
+        raise ValueError("Blocks must fit in 5x5 cells.")
+
+    bloc = [[0] * 5 for i in range(5)]
+    for dy, dx in cells:
+        bloc[4-dy][dx] = 1
+
+    catalog.append(compile_bloc(bloc))
+    index_by_cells[cells] = len(catalog) - 1
+    return len(catalog) - 1
+
+# Compiled blocks of the game, in the same order as "block_list"
+catalog = compile_blocks(block_list)
+
+# Index of the first block of the catalog with each shape, by canonical form
+index_by_cells = {}
+for i, bloc in enumerate(catalog):
+    index_by_cells.setdefault(canonical_cells(bloc.cells), i)
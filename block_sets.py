@@ -0,0 +1,161 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file loads the block sets of the boards.
+# A board declares the blocks that can be played on it in a ".blocks" file
+# next to it (board_shapes/circle.txt uses board_shapes/circle.blocks).
+# In this file, blocks are drawn with '#' for their cells and '.' for the
+# empty ones, and separated by empty lines :
+#
+#   # Comments start with "#" followed by a space
+#   include general.blocks     <- blocks of another file (relative path)
+#
+#   @ rotations mirrors        <- also adds the rotations and mirrors of the next block
+#   #.
+#   ##
+#
+# Blocks with the same shape are only kept once, and are added to the catalog
+# (see block_catalog.py) if they aren't in it yet.
+# Reading the files and finding the rotations of the blocks is only done once :
+# the shapes found are cached in BLOCK_CACHE, by hash of the content of the files.
+
+import hashlib
+import json
+import os
+
+from block_catalog import canonical_cells, register_bloc
+
+# Folder containing the block sets already read
+BLOCK_CACHE = ".block_cache"
+
+# Return the path of the block set of a board
+def blocks_path(board_path) -> str:
+    return os.path.splitext(board_path)[0] + ".blocks"
+
+# Read a block set file, and the files it includes
+# Return a list of (path, lines) for every file, in the order they are read
+def read_sources(path, seen=None) -> list:
+    if seen is None:
+        seen = set()
+    path = os.path.normpath(path)
+    if path in seen:
+        return []
+    seen.add(path)
+
+    with open(path, 'r') as file:
+        lines = file.read().splitlines()
+
+    sources = [(path, lines)]
+    for line in lines:
+        if line.startswith("include "):
+            include = os.path.join(os.path.dirname(path), line[len("include "):].strip())
+            sources.extend(read_sources(include, seen))
+
+    return sources
+
+# Return every rotation and mirror of a block, without duplicates
+# "cells" is the canonical form of the block, which comes first
+def variants(cells, rotations, mirrors) -> list:
+    shapes = [cells]
+    if mirrors:
+        shapes.append(canonical_cells([(dy, -dx) for dy, dx in cells]))
+    if rotations:
+        for shape in list(shapes):
+            for i in range(3):
+                shape = canonical_cells([(dx, -dy) for dy, dx in shape])
+                shapes.append(shape)
+
+    return list(dict.fromkeys(shapes))
+
+# Convert the lines of a drawn block to the (dy, dx) offsets of its cells
+# Return the canonical form of the block
+def parse_drawing(drawing) -> tuple:
+    cells = []
+    for i, line in enumerate(drawing):
+        for j, c in enumerate(line.strip()):
+            if c == '#':
+                cells.append((len(drawing)-1-i, j))
+            elif c != '.':
+                raise ValueError(f"Unknown cell '{c}' in a block.")
+    if not cells:
+        raise ValueError("A block has no cell.")
+
+    return canonical_cells(cells)
+
+# Find the shapes of the blocks of a file, in the order they are declared
+# "sources" is the list returned by read_sources, the included files are
+# read where their "include" line is
+# Return a list of canonical forms, without duplicates
+def parse_blocks(path, sources) -> list:
+    lines = dict(sources)[path]
+    shapes = []
+    options = set()
+    drawing = []
+    for line in lines + [""]:
+        line = line.strip()
+        if line.startswith("# "):
+            continue
+
+        if line.startswith("include "):
+            include = os.path.normpath(os.path.join(os.path.dirname(path), line[len("include "):].strip()))
+            if include in dict(sources):
+                shapes.extend(parse_blocks(include, sources))
+        elif line.startswith("@"):
+            options = set(line[1:].split())
+        elif line:
+            drawing.append(line)
+        elif drawing:
+            cells = parse_drawing(drawing)
+            shapes.extend(variants(cells, "rotations" in options, "mirrors" in options))
+            options = set()
+            drawing = []
+
+    return list(dict.fromkeys(shapes))
+
+# Return the hash of the content of block set files
+def sources_hash(sources) -> str:
+    digest = hashlib.sha256()
+    for path, lines in sources:
+        digest.update("\n".join(lines).encode() + b"\0")
+
+    return digest.hexdigest()
+
+# Return the shapes of a block set, from the cache if it was already read
+def load_shapes(path) -> list:
+    sources = read_sources(path)
+    cache_path = os.path.join(BLOCK_CACHE, sources_hash(sources) + ".json")
+
+    try:
+        with open(cache_path, 'r') as file:
+            return [tuple(tuple(cell) for cell in shape) for shape in json.load(file)]
+    except (OSError, ValueError):
+        pass
+
+    shapes = parse_blocks(os.path.normpath(path), sources)
+    try:
+        os.makedirs(BLOCK_CACHE, exist_ok=True)
+        with open(cache_path, 'w') as file:
+            json.dump(shapes, file, separators=(',', ':'))
+    except OSError:
+        pass
+
+    return shapes
+
+# Load the block set of a board, adding its blocks to the catalog
+# Return the list of the indexes of its blocks in the catalog, or None if
+# the board has no block set or if it can't be read
+def load_block_set(board_path):
+    path = blocks_path(board_path)
+    if not os.path.isfile(path):
+        return None
+
+    try:
+        return [register_bloc(shape) for shape in load_shapes(path)]
+    except (OSError, ValueError) as error:
+        print(f"The blocks of {path} can't be read : {error}")
+        return None
@@ -9,41 +9,35 @@
 # This file contains every functions needed in the game.
 
 from random import sample
-from copy import deepcopy
 from math import ceil
 from os.path import isfile
-from block_general import block_list
+from block_catalog import catalog, compile_bloc
+from block_sets import load_block_set
+from bitboard import BitBoard
+from sparse_board import SparseBoard
+from compact_board import CompactBoard
+import render
+from board_cache import BoardData, compile_board, load_board
+from coords import label, label_width, column_header, parse_coord
 
 import os 
 if os.name == "nt": CLS_COMMAND = "cls"
 if os.name == "posix": CLS_COMMAND = "clear"
 
-# Lists containing every block possible for each board type
-circle_list = [0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31]
-diamond_list = [0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,32,33,34,35,36,37,38,39,40,41,42,30,28,20]
-triangle_list = [0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,44,45,46,47,48,49,50,51,52,53,54]
+# Blocks used on boards without a block set (see block_sets.py)
 general_list = [0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19]
 
 # Convert a .txt file given by it's path to a 2D matrix of the board
+# Binary boards (see binary_board.py) are detected and read too
+# The files already read are cached (see board_cache.py)
 # Returns a 2D matrix of the board if sucessful, 
 def read_grid(path) -> list:
-    try:
-        board = open(path, 'r+')
-    except FileNotFoundError:
+    data = load_board(path)
+    if data is None:
         print(f"No grid exists at {path}.")
         return []
 
-    lines = board.readlines()
-
-    # Converts the lines gotten from the .readlines() function
-    # to a 2D matrix.
-    grid = []
-    for line in lines:
-        line = line .replace("\n", "") .split(" ")
-        grid.append(line)
-
-    board.close()
-    return grid
+    return data.copy_grid()
 
 # Convert a 2D matrix in a .txt file in the same format as the default board
 # Returns a 0 if the file was saved sucessfuly, or a 1 if the file wasn't saved
@@ -65,21 +59,18 @@ def save_grid(path, grid) -> int:
     return 0
 
 # Print the board to a readable format
+# Columns and rows are named as in coords.py, so any size of board can be printed
 def print_grid(grid) -> None:
-    col_letters = "abcdefghijklmnopqrstuvwxyz"
-    row_letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-
     nb_col = len(grid[0])
     nb_row = len(grid)
+    width = label_width(nb_row)
 
     # Print the top letters
-    print("    ", end="")
-    for i in range(nb_col):
-        print(col_letters[i%26], end=" ")
-    print()
+    for line in column_header(nb_col, " " * (width+3)):
+        print(line)
 
     # Print the top border of the board
-    print("  ╔═", end="")
+    print(" " * width + " ╔═", end="")
     for i in range(nb_col):
         print("══", end="")
     print("╗")
@@ -88,18 +79,20 @@ def print_grid(grid) -> None:
     for i in range(nb_row):
 
         # Print the left letters and border of the board
-        print(row_letters[i%26]+" ║ ", end="")
+        print(label(i, True).rjust(width)+" ║ ", end="")
 
         for c in grid[i]:
             if c=='0': print(" ", end=" ")
             if c=='1': print("·", end=" ")
             if c=='2': print("■", end=" ")
+            if c=='3': print("○", end=" ")
+            if c=='4': print("●", end=" ")
 
         # Print the right border of the board
         print("║")
 
     # Print the bottom border of the board
-    print("  ╚═", end="")
+    print(" " * width + " ╚═", end="")
     for i in range(nb_col):
         print("══", end="")
     print("╝")
@@ -119,11 +112,7 @@ def print_blocs(blocs, pol) -> None:
     for az in range(ceil(len(blocs)/len_line)):
         for row in range(5):
             for bloc in blocs[len_line*az: len_line*(az+1)]:
-                current_line = block_list[bloc][row]
-                for cell in current_line:
-                    if cell==0 : print(" ", end=" ")
-                    if cell==1 : print("■", end=" ")
-                print("   ", end="")
+                print(catalog[bloc].lines[row], end="   ")
             print()
         print()
     
@@ -138,166 +127,410 @@ def print_score(score) -> None:
   ╚═══════════════════════════════════════╝
     """)
 
+# Print everything shown during a turn : the score, the board and the blocks
+# Use the renderer chosen in render.py, the "legacy" one being the functions above
+def print_turn(score, grid, blocs, pol) -> None:
+    if render.renderer == "legacy":
+        os.system(CLS_COMMAND)
+        print_score(score)
+        print_grid(grid)
+        print_blocs(blocs, pol)
+    elif render.renderer == "diff":
+        render.diff_renderer.draw(score, grid, blocs, pol)
+    else:
+        render.draw_frame(score, grid, blocs, pol)
+
 # Return the list of blocks available
 # If pol = 2, return a list containing 3 random block from the list
 # If pol = 1, return the entire list
-def select_bloc(list_of_blocs, pol) -> list:
+# "rng" is the random.Random used to draw the blocks, if None the global one is used
+def select_bloc(list_of_blocs, pol, rng=None) -> list:
     if pol == 1:
         return list_of_blocs
     if pol == 2:
-        return sample(list_of_blocs, 3)
+        if rng is None:
+            return sample(list_of_blocs, 3)
+        return rng.sample(list_of_blocs, 3)
 
     return []
 
 # Check if a block can be placed on the board at an (x,y) location
+# "bloc" is a compiled block, or a 5x5 matrix that is then compiled
 # (x,y) refers to the bottom-left corner of the block
 # Return True if the block can be placed, False otherwise
 def valid_position(grid, bloc, x, y) -> bool:
     nb_col = len(grid[0])
 
-    if grid[y][x] == 0:
-        return False
-    
+    if isinstance(bloc, list):
+        bloc = compile_bloc(bloc)
+
     # Go through every cell of the block
-    # "y-(4-i)" is used to go through the y position of the block backward
+    # "y-dy" is used to go through the y position of the block backward
     # because (x,y) correspond to the bottom-left corner of the block
-    for i in range(5):
-        for j in range(5):
-            cell = bloc[i][j]
-
-            # Ignore if cell is empty
-            if cell == 0:
-                continue
-
-            if y-(4-i) < 0 or x+j >= nb_col:
-                return False
+    for dy, dx in bloc.cells:
+        if y-dy < 0 or x+dx >= nb_col:
+            return False
 
-            if grid[y-(4-i)][x+j] in ('0','2'):
-                return False
+        if grid[y-dy][x+dx] in ('0','2'):
+            return False
 
     return True
 
 # Place a block on the board at an (x,y) location
+# "bloc" is a compiled block, or a 5x5 matrix that is then compiled
 # (x,y) refers to the bottom-left corner of the block
 # Return the board with the block placed
 def place_bloc(grid, bloc, x, y) -> list:
-    for i in range(5):
-        for j in range(5):
-            cell = bloc[i][j]
+    if isinstance(bloc, list):
+        bloc = compile_bloc(bloc)
 
-            # Ignore if cell is empty
-            if cell == 0:
-                continue
-
-            grid[y-(4-i)][x+j] = '2'
+    for dy, dx in bloc.cells:
+        grid[y-dy][x+dx] = '2'
             
     return grid
 
 # Check if a row at index i is complete
+# A row without any playable cell is never complete
 # Return True if the row is complete, False otherwise
 def row_state(grid, i) -> bool:
-    return '1' not in grid[i]
+    return '1' not in grid[i] and '2' in grid[i]
 
 # Clear a row at index i
-# Return a tuple containing the new board and the score gained from this row 
-# NOTE: This function does not modify the board given in its parameters
+# Return a tuple containing the board and the score gained from this row 
+# NOTE: This function modifies the board given in its parameters
 def row_clear(grid, i) -> tuple:
-    temp_grid = deepcopy(grid)
     score = 0
 
-    for c in range(len(temp_grid[i])):
-        if temp_grid[i][c] != '0' :
-            temp_grid[i][c] = '1'
+    line = grid[i]
+    for c in range(len(line)):
+        if line[c] != '0' :
+            line[c] = '1'
             score += 1
 
-    return temp_grid, score
+    return grid, score
 
 # Check if a column at index j is complete
 # Return True if the column is complete, False otherwise
 def col_state(grid, j) -> bool:
+    playable = False
     for c in range(len(grid)):
         if grid[c][j] == '1':
             return False
+        if grid[c][j] == '2':
+            playable = True
 
-    return True
+    return playable
 
 # Clear a column at index j
-# Return a tuple containing the new board and the score gained from this column 
-# NOTE: This function does not modify the board given in its parameters
+# Return a tuple containing the board and the score gained from this column 
+# NOTE: This function modifies the board given in its parameters
 def col_clear(grid, j) -> tuple:
-    temp_grid = deepcopy(grid)
     score = 0
 
-    for i in range(len(temp_grid)):
-        if temp_grid[i][j] != '0':
-            temp_grid[i][j] = '1'
+    for line in grid:
+        if line[j] != '0':
+            line[j] = '1'
             score += 1
 
-    return temp_grid, score
+    return grid, score
+
+# Remove the rows whose indexes are in "rows" and make everything above them fall
+# In each column, every group of vertically adjacent playable cells above a
+# removed row falls down 1 cell per removed row under it. A cell falling on
+# a non playable cell is lost, and the cells left empty at the top become '1'.
+# A removed cell at the top of its group has nothing to replace it, so it stays.
+# This is done in a single pass over each column, from the bottom up.
+# Return the board
+# NOTE: This function modifies the board given in its parameters
+def make_rows_fall(grid, rows) -> list:
+    if not rows:
+        return grid
+
+    lowest = max(rows)
+    removed = [False] * (lowest+1)
+    for i in rows:
+        removed[i] = True
+
+    # below[i] is the number of removed rows under row i
+    below = [0] * (lowest+1)
+    count = 0
+    for i in range(lowest, -1, -1):
+        below[i] = count
+        if removed[i]:
+            count += 1
+
+    for c in range(len(grid[0])):
+        i = lowest
+        while i >= 0:
+            if grid[i][c] == '0':
+                i -= 1
+                continue
+
+            # Go up the group of playable cells, "w" being the next cell to write
+            # The lowest cells of the group are lost for each removed row under it
+            lost = below[i]
+            w = i
+            while i >= 0 and grid[i][c] != '0':
+                if not removed[i] or i == 0 or grid[i-1][c] == '0':
+                    if lost:
+                        lost -= 1
+                    else:
+                        grid[w][c] = grid[i][c]
+                        w -= 1
+                i -= 1
+
+            for k in range(w, i, -1):
+                grid[k][c] = '1'
 
-# Make the row above the row at index i fall down 1 row
-# Calls itself recursively to make every row above row at index i fall
-# If i = 0, that is the top row, return itself, as there are no row above
-# Return the new board
-# NOTE: This function does not modify the board given in its parameters
+    return grid
+
+# Make the rows above the row at index i fall down 1 row
+# If i = 0, that is the top row, return the board, as there are no row above
+# Return the board
+# NOTE: This function modifies the board given in its parameters
 def make_bloc_fall(grid, i):
     if i <= 0:
         return grid
-    temp_grid = deepcopy(grid)
-
-    for it, j in enumerate(grid[i-1]):
-        if j == '0': continue
-        if temp_grid[i][it] != '0':
-            temp_grid[i][it] = temp_grid[i-1][it]
-        temp_grid[i-1][it] = '1'
 
-    temp_grid = make_bloc_fall(temp_grid, i-1)
-
-    return temp_grid
+    return make_rows_fall(grid, [i])
 
 # Check if any row and column are completed. If it is the case, clear them
-# Return the new board
-# NOTE: This function does not modify the board given in its parameters
+# Every completed line is found before clearing any of them
+# Return a tuple containing the board and the score gained
+# NOTE: This function modifies the board given in its parameters
 def clear_rows_and_col(grid) -> tuple:
-    temp_grid = deepcopy(grid)
     score = 0
 
-    for i in range(len(grid)):
-        if row_state(grid, i): 
-            temp_grid, s = row_clear(temp_grid, i)
-            temp_grid = make_bloc_fall(temp_grid, i)
-            score += s
-
-    for j in range(len(grid[0])):
-        if col_state(grid, j): 
-            temp_grid, s = col_clear(temp_grid, j)
+    full_rows = [i for i in range(len(grid)) if row_state(grid, i)]
+    full_cols = [j for j in range(len(grid[0])) if col_state(grid, j)]
+
+    for i in full_rows:
+        grid, s = row_clear(grid, i)
+        score += s
+    grid = make_rows_fall(grid, full_rows)
+
+    for j in full_cols:
+        grid, s = col_clear(grid, j)
+        score += s
+
+    return grid, score
+
+# Board engines
+
+# Board engine working directly on the 2D matrix of the board
+# The counters of free cells are computed from the cells when the board is
+# created, so they are rebuilt when a board saved with save_grid is read again
+# Every engine gives access to the same methods : valid_position, place_bloc,
+# clear_rows_and_col, to_grid and free_rows (bitmask of the free cells of each
+# row, bit j being the column j), with blocks given by their index in "catalog"
+class GridBoard:
+    def __init__(self, grid):
+        self.setup(grid, compile_board(grid))
+
+    # Create a board from the data of a board file (see board_cache.py)
+    # Return the board
+    @classmethod
+    def from_data(cls, data):
+        board = cls.__new__(cls)
+        board.setup(data.copy_grid(), data)
+        return board
+
+    # Set every attribute of the board from its 2D matrix and its data
+    def setup(self, grid, data) -> None:
+        self.grid = grid
+        self.nb_row = data.nb_row
+        self.nb_col = data.nb_col
+
+        # Number of playable cells, and of free cells, in each row and column
+        # The free cells counters are kept up to date by every method,
+        # so that only the lines that changed have to be checked
+        self.row_capacity = data.row_capacity
+        self.col_capacity = data.col_capacity
+        self.row_free = [c - f.bit_count() for c, f in zip(data.row_capacity, data.filled)]
+        self.col_free = [c - column.count('2') for c, column in zip(data.col_capacity, zip(*grid))]
+
+        # Playable cells of each row, as a string of '0' and '1'
+        # A row with the same shape as the row above it can fall as a whole
+        self.shapes = [format(p, f"0{self.nb_col}b")[::-1] for p in data.playable]
+        self.same_shape = [i > 0 and self.shapes[i] == self.shapes[i-1] for i in range(self.nb_row)]
+
+        # Bitmask of the free cells of each row, returned by free_rows
+        # Placing a block or clearing a column updates it directly, the rows
+        # that fell are read again from the cells when it is asked
+        self.free = [p & ~f for p, f in zip(data.playable, data.filled)]
+        self.stale_rows = set()
+
+        # Number of lines cleared since the board was created
+        self.cleared = 0
+
+        # Lines that changed since the last call to clear_rows_and_col
+        self.dirty_rows = set(range(self.nb_row))
+        self.dirty_cols = set(range(self.nb_col))
+
+    def to_grid(self) -> list:
+        return self.grid
+
+    def free_rows(self) -> list:
+        for i in self.stale_rows:
+            self.free[i] = int("".join(reversed(self.grid[i])).replace('2', '0') or "0", 2)
+        self.stale_rows = set()
+        return self.free[:]
+
+    def valid_position(self, bloc, x, y) -> bool:
+        if x < 0 or y < 0 or x >= self.nb_col or y >= self.nb_row:
+            return False
+        return valid_position(self.grid, catalog[bloc], x, y)
+
+    def place_bloc(self, bloc, x, y) -> None:
+        place_bloc(self.grid, catalog[bloc], x, y)
+
+        for dy, dx in catalog[bloc].cells:
+            self.row_free[y-dy] -= 1
+            self.col_free[x+dx] -= 1
+            self.dirty_rows.add(y-dy)
+            self.dirty_cols.add(x+dx)
+        for dy, mask in catalog[bloc].masks:
+            self.free[y-dy] &= ~(mask << x)
+
+    # Make the rows above the row at index i fall down 1 row, like make_bloc_fall
+    # The rows are moved as a whole when they have the same shape as the row
+    # under them, which is the case of every row on rectangular boards
+    def make_bloc_fall(self, i) -> None:
+        grid = self.grid
+        for r in range(i, 0, -1):
+            if self.same_shape[r]:
+                grid[r] = grid[r-1]
+            else:
+                grid[r] = ['2' if a == '2' and e == '1' else e for a, e in zip(grid[r-1], self.shapes[r])]
+        grid[0] = list(self.shapes[0])
+        self.stale_rows.update(range(i+1))
+
+    # Only the lines that changed since the last call are checked
+    def clear_rows_and_col(self) -> int:
+        full_rows = sorted(i for i in self.dirty_rows
+                           if self.row_free[i] == 0 and self.row_capacity[i])
+        full_cols = sorted(j for j in self.dirty_cols
+                           if self.col_free[j] == 0 and self.col_capacity[j])
+        self.dirty_rows = set()
+        self.dirty_cols = set()
+        self.cleared += len(full_rows) + len(full_cols)
+        score = 0
+
+        if full_rows:
+            # Every row under the lowest cleared row stays the same, so only
+            # the counters of the rows above it have to be computed again
+            lowest = full_rows[-1]
+            old_filled = [col.count('2') for col in zip(*self.grid[:lowest+1])]
+
+            for i in full_rows:
+                self.make_bloc_fall(i)
+                self.row_free[i] = self.row_capacity[i]
+                score += self.row_capacity[i]
+
+            for i in range(lowest+1):
+                free = self.grid[i].count('1')
+                if free != self.row_free[i]:
+                    self.row_free[i] = free
+                    self.dirty_rows.add(i)
+
+            new_filled = [col.count('2') for col in zip(*self.grid[:lowest+1])]
+            for j in range(self.nb_col):
+                if new_filled[j] != old_filled[j]:
+                    self.col_free[j] += old_filled[j] - new_filled[j]
+                    self.dirty_cols.add(j)
+
+        for j in full_cols:
+            for i in range(self.nb_row):
+                if self.grid[i][j] == '2':
+                    self.row_free[i] += 1
+                    self.free[i] |= 1 << j
+            self.grid, s = col_clear(self.grid, j)
+            self.col_free[j] = self.col_capacity[j]
             score += s
 
-    return temp_grid, score
+        return score
+
+# Boards with less playable cells than this share of their cells are played
+# with the sparse engine by the "auto" engine
+SPARSE_DENSITY = 0.25
+
+# Create a board with the engine best suited to its shape : the sparse engine
+# for boards made mostly of void cells, the grid engine otherwise
+# "grid" is a 2D matrix of the board, or the data of a board file
+# Return the board
+def auto_board(grid):
+    data = grid if isinstance(grid, BoardData) else compile_board(grid)
+    engine = GridBoard
+    if sum(data.row_capacity) < SPARSE_DENSITY * data.nb_row * data.nb_col:
+        engine = SparseBoard
+
+    if isinstance(grid, BoardData):
+        return engine.from_data(data)
+    return engine(grid)
+
+# Every engine available, by name
+engines = {
+    "grid": GridBoard,
+    "bitboard": BitBoard,
+    "sparse": SparseBoard,
+    "compact": CompactBoard,
+    "auto": auto_board,
+}
+
+# The NumPy engine is only available if NumPy is installed
+try:
+    from numpy_board import NumpyBoard
+    engines["numpy"] = NumpyBoard
+except ImportError:
+    pass
+
+# Create a board using the engine given by its name
+# "grid" is a 2D matrix of the board, a board of any engine, or the data of
+# a board file (see board_cache.py)
+# Return the board, or None if the engine doesn't exist
+def make_board(grid, engine="grid"):
+    if engine not in engines:
+        print(f"No engine named {engine}.")
+        return None
+
+    if isinstance(grid, BoardData):
+        if engine == "auto":
+            return auto_board(grid)
+        if hasattr(engines[engine], "from_data"):
+            return engines[engine].from_data(grid)
+        return engines[engine](grid.copy_grid())
+
+    if hasattr(grid, "to_grid"):
+        if engine == "auto" or isinstance(grid, engines[engine]):
+            return grid
+        grid = grid.to_grid()
+
+    return engines[engine](grid)
 
 # Get the block list associated with a board
 # "path" refers to the path to the file
-# Return a list containing the blocks available
+# The blocks are declared in a ".blocks" file next to the board (see block_sets.py)
+# Return the list of the indexes of the blocks, "general_list" if the board has none
 def get_block_list(path) -> list:
-    if path == "board_shapes/circle.txt":
-        return circle_list
-    elif path == "board_shapes/diamond.txt":
-        return diamond_list
-    elif path == "board_shapes/triangle.txt":
-        return triangle_list
-    else:
+    bloc_list = load_block_set(path)
+    if bloc_list is None:
         return general_list
+    return bloc_list
 
 # Menu Functions
 
 # Print the main menu, and ask the user where to go next
+# "save" tells if a game can be resumed, if None the saves of the game are looked for
 # Return an integer, corresponding to where to go next
-def show_menu() -> int:
+def show_menu(save=None) -> int:
     os.system(CLS_COMMAND)
 
-    save = isfile("save.txt")
-    if save: options = (1,2,3,4)
-    else: options = (1,3,4)
+    from journal import can_resume
+
+    if save is None:
+        save = can_resume() or isfile("save.txt")
+    if save: options = (1,2,3,4,5)
+    else: options = (1,3,4,5)
 
     print(f"""
      ████████╗███████╗██████╗ ██████╗ ██╗███████╗
@@ -311,7 +544,8 @@ def show_menu() -> int:
     [1] Start Game
     [2] Resume Game {"(Not Available)" if not save else ""}
     [3] Show Rules
-    [4] Exit
+    [4] Watch the Bot
+    [5] Exit
     """)
 
     choice = 0
@@ -492,6 +726,9 @@ def show_rules() -> None:
 ║        3> Both letters should be written on the    ║
 ║           same line, no space is needed.           ║
 ║           (e.g. : Am ; oG ; us)                    ║
+║        On big boards, write the column in lower    ║
+║        case and the row in upper case, or use a    ║
+║        space or numbers (e.g. : abAC ; ab AC).     ║
 ║                                                    ║
 ║ >>> PAUSE MENU :                                   ║
 ║     To access the pause menu while in a game,      ║
@@ -543,21 +780,73 @@ def pause_menu() -> int:
     return c
 
 # Play the game
-def game(board, bloc_list, pol) -> None:
-    nb_col = len(board[0])
-    nb_row = len(board)
-    
-    # Main Game Loop
-    blocs = select_bloc(bloc_list, pol)
-    score = 0
+# The rules are applied by a GameState (see engine.py), this function only
+# reads the moves of the player and prints the game
+# "engine" is the name of the board engine used to apply the rules
+# "path" is the path of the board, if given every move is saved in the journal
+def game(board, bloc_list, pol, engine="grid", path=None) -> None:
+    from engine import GameState
+    from journal import Journal, can_resume
+
+    if engine not in engines:
+        print(f"No engine named {engine}.")
+        return
+
+    state = GameState(board, bloc_list, pol, engine=engine)
+
+    journal = None
+    if path is not None:
+        # The journal of a new game replaces the game saved in it
+        if can_resume():
+            print("A saved game exists. Starting a new game will erase it. Do you wish to continue ?\n    [Y/N] ", end="")
+            c = input()
+            if c.lower() != 'y':
+                return
+        journal = Journal()
+        journal.start(state, path)
+
+    play_state(state, journal)
+
+# Resume the game saved in the journal
+def resume_game(engine="grid") -> None:
+    from journal import Journal, load_journal
+
+    if engine not in engines:
+        print(f"No engine named {engine}.")
+        return
+
+    state = load_journal(engine=engine)
+    if state is None:
+        print("The saved game can't be loaded.")
+        input()
+        return
+
+    journal = Journal()
+    journal.reopen()
+    play_state(state, journal)
+
+# Main Game Loop, on a GameState
+# Every move is written to the journal, if there is one
+def play_state(state, journal=None) -> None:
+    pol = state.pol
+    nb_col = state.board.nb_col
+    nb_row = state.board.nb_row
+    render.diff_renderer.reset()
 
     attempts = 0
     while True:
-        os.system(CLS_COMMAND)
+        # The game ends by itself once no block of the hand can be placed
+        if state.is_over():
+            if journal is not None:
+                journal.end(state)
+            print_turn(state.score, state.grid(), state.hand(), pol)
+            end_screen(state.score)
+            break
+
+        blocs = state.hand()
+
         # Print elements to the screen
-        print_score(score)
-        print_grid(board)
-        print_blocs(blocs, pol)
+        print_turn(state.score, state.grid(), blocs, pol)
 
         c = -2
         blocs_available = list(range(1, len(blocs)+1))
@@ -567,52 +856,48 @@ def game(board, bloc_list, pol) -> None:
         if c == -1:
             os.system(CLS_COMMAND)
             q = pause_menu()
+            render.diff_renderer.reset()
             if q == 1:
                 continue
             elif q == 2:
-                save_grid("save.txt", board)
+                # Every move is already in the journal
+                if journal is not None:
+                    journal.close()
+                else:
+                    save_grid("save.txt", state.grid())
                 break
             elif q == 3:
-                end_screen(score)
+                if journal is not None:
+                    journal.end(state)
+                end_screen(state.score)
                 break
         
         c -= 1
-        b = block_list[blocs[c]]
-
-        correct_coord = False
-        while not correct_coord:
-            coord = ""
-            while len(coord) <= 1:
-                coord = input("    [Coord] ")
-
-            coord = [coord[0], coord[-1]]
-            try:
-                coord = [e.lower() for e in coord]
-            except:
-                continue
+        b = blocs[c]
 
-            coord = [ord(e)-97 for e in coord]
-            if not(coord[0] < 0 or coord[0] > nb_col or coord[1] < 0 or coord[1] > nb_row):
-                correct_coord = True
+        # Show where the block can be placed
+        if render.hints:
+            print_turn(state.score, render.hint_grid(state.grid(), state.origins(b)), blocs, pol)
+            print(f"    [B] {c+1}")
+
+        coord = None
+        while coord is None:
+            coord = parse_coord(input("    [Coord] "), nb_col, nb_row)
 
         x, y = coord
 
         if attempts >= 3:
-            end_screen(score)
+            if journal is not None:
+                journal.end(state)
+            end_screen(state.score)
             break
-        if not valid_position(board, b, x, y):
+        if state.play(b, x, y) < 0:
             attempts += 1
             continue
 
-        place_bloc(board, b, x, y)
-        blocs = select_bloc(bloc_list, pol)
+        if journal is not None:
+            journal.record(state, b, x, y)
         attempts = 0
-        score += 1
-
-        points = -1
-        while points != 0:
-            board, points = clear_rows_and_col(board)
-            score += points
 
 # Print the score at the end of a game
 def end_screen(score) -> None:
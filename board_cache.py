@@ -0,0 +1,180 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the cache of the boards read from files.
+# A board file is parsed once, and turned into a BoardData : its cells, the
+# bitmasks of the playable and filled cells of each row and the number of
+# playable cells of each line. The board engines are created directly from
+# these, without going through every cell again.
+# The boards already read are kept :
+#   - in memory, for the last MEMORY_SIZE files, by path, modification time and size
+#   - on disk, in BOARD_CACHE, by hash of the content of the file : a binary
+#     board (see binary_board.py) followed by the capacities of the lines
+# A board file that changed has another modification time and content, so
+# it is read again.
+
+import hashlib
+import os
+import tempfile
+from array import array
+from collections import OrderedDict
+from typing import NamedTuple
+
+# Folder containing the boards already read
+BOARD_CACHE = ".board_cache"
+
+# Number of boards kept in memory
+MEMORY_SIZE = 16
+
+# A board read from a file
+#   - "grid" : the 2D matrix of the board, that must not be modified (see copy_grid)
+#   - "playable", "filled" : for every row, the bitmask of its playable cells
+#     and of its filled cells (bit j for the column j)
+#   - "row_capacity", "col_capacity" : the number of playable cells of each line
+class BoardData(NamedTuple):
+    grid: list
+    nb_row: int
+    nb_col: int
+    playable: list
+    filled: list
+    row_capacity: list
+    col_capacity: list
+
+    # Return a copy of the 2D matrix of the board, that can be modified
+    def copy_grid(self) -> list:
+        return [line[:] for line in self.grid]
+
+# Compute the data of a board from its 2D matrix
+# Every row is converted at once, from the string of its cells
+# Return the BoardData
+def compile_board(grid) -> BoardData:
+    nb_col = len(grid[0]) if grid else 0
+    playable = []
+    filled = []
+    for line in grid:
+        text = "".join(reversed(line)) or "0"
+        playable.append(int(text.replace('2', '1'), 2))
+        filled.append(int(text.replace('1', '0').replace('2', '1'), 2))
+
+    row_capacity = [len(line) - line.count('0') for line in grid]
+    col_capacity = [len(column) - column.count('0') for column in zip(*grid)]
+
+    return BoardData(grid, len(grid), nb_col, playable, filled, row_capacity, col_capacity)
+
+# Build the 2D matrix of a board from the bitmasks of its rows
+# Return the 2D matrix
+def rows_to_grid(nb_col, playable, filled) -> list:
+    grid = []
+    for p, f in zip(playable, filled):
+        line = list(format(p, f"0{nb_col}b")[::-1]) if nb_col else []
+        while f:
+            low = f & -f
+            line[low.bit_length()-1] = '2'
+            f ^= low
+        grid.append(line)
+
+    return grid
+
+# Convert a .txt file to a 2D matrix of the board
+# Empty lines and trailing spaces are ignored
+# Return the 2D matrix
+def parse_text(path) -> list:
+    grid = []
+    with open(path, 'r') as board:
+        for line in board:
+            line = line.split()
+            if line:
+                grid.append(line)
+
+    return grid
+
+# Write the data of a board to the disk cache
+# The file is written next to its path, then moved to it at once, so that a
+# file cut in the middle (or written by two processes at once) is never read
+def write_cache(path, data) -> None:
+    from binary_board import HEADER, MAGIC
+
+    row_bytes = (data.nb_col + 7) // 8
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, data.nb_row, data.nb_col, row_bytes))
+            for plane in (data.playable, data.filled):
+                file.write(b"".join(row.to_bytes(row_bytes, 'little') for row in plane))
+            file.write(array('I', data.row_capacity).tobytes())
+            file.write(array('I', data.col_capacity).tobytes())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+# Read the data of a board from the disk cache, or from a binary board
+# The capacities of the lines are computed if they aren't in the file
+# Return the BoardData
+def read_cache(path) -> BoardData:
+    from binary_board import HEADER, map_binary
+
+    data, nb_row, nb_col, row_bytes = map_binary(path)
+    planes = []
+    start = HEADER.size
+    for _ in range(2):
+        planes.append([int.from_bytes(data[start+i*row_bytes:start+(i+1)*row_bytes], 'little')
+                       for i in range(nb_row)])
+        start += nb_row * row_bytes
+
+    capacities = array('I')
+    capacities.frombytes(data[start:start + 4 * (nb_row + nb_col)])
+    data.close()
+
+    grid = rows_to_grid(nb_col, planes[0], planes[1])
+    if len(capacities) != nb_row + nb_col:
+        return compile_board(grid)
+
+    return BoardData(grid, nb_row, nb_col, planes[0], planes[1],
+                     capacities[:nb_row].tolist(), capacities[nb_row:].tolist())
+
+# Boards kept in memory, by (path, modification time, size), the last used at the end
+memory = OrderedDict()
+
+# Read a board file (text or binary), using the caches
+# Return the BoardData, or None if the file can't be read
+def load_board(path):
+    from binary_board import is_binary
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key in memory:
+        memory.move_to_end(key)
+        return memory[key]
+
+    if is_binary(path):
+        data = read_cache(path)
+    else:
+        with open(path, 'rb') as file:
+            digest = hashlib.sha256(file.read()).hexdigest()
+        cache_path = os.path.join(BOARD_CACHE, digest + ".tlb")
+
+        try:
+            data = read_cache(cache_path)
+        except (OSError, ValueError):
+            data = compile_board(parse_text(path))
+            try:
+                os.makedirs(BOARD_CACHE, exist_ok=True)
+                write_cache(cache_path, data)
+            except OSError:
+                pass
+
+    memory[key] = data
+    if len(memory) > MEMORY_SIZE:
+        memory.popitem(last=False)
+
+    return data
@@ -0,0 +1,232 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the computer player of the game.
+# The bot tries every move of its hand on a copy of the board, gives a value
+# to each resulting board, and keeps the best ones (the "beam") to look
+# further ahead. With a depth and width of 1, it plays the best move right away.
+# As many move orders lead to the same board, the value of every board seen
+# is kept in a bounded transposition table.
+#
+# e.g. : py bot.py board_shapes/circle.txt --pol 2 --depth 2 --width 8
+
+import argparse
+import sys
+import time
+from collections import OrderedDict
+from random import Random
+
+from bitboard import BitBoard
+from moves import legal_origins, origins_to_moves
+
+# Default weights of the heuristic
+default_weights = {
+    "score": 1.0,   # per point gained
+    "holes": 2.0,   # per free cell surrounded by filled or non playable cells
+    "fill": 20.0,   # times the ratio of filled cells
+    "near": 1.5,    # per line missing only 1 or 2 cells
+}
+
+class Bot:
+    # "depth" is the number of moves looked ahead, "width" the number of
+    # boards kept at each step, and "cache_size" the maximum number of
+    # boards kept in the transposition table
+    # NOTE: The next hands are unknown, so the moves looked ahead are
+    # made with the blocks of the current hand
+    def __init__(self, depth=1, width=1, cache_size=100000, weights=None):
+        self.depth = depth
+        self.width = width
+        self.cache_size = cache_size
+        self.weights = dict(default_weights, **(weights or {}))
+
+        self.cache = OrderedDict()
+        self.shapes = {}
+        self.hits = 0
+        self.moves = 0
+        self.time = 0.0
+
+    # Return the salt of the shape of a board (its playable cells), a random
+    # 64 bits integer drawn the first time the shape is seen
+    # Boards of the same size can have other shapes, and so other values
+    def shape(self, board) -> int:
+        shape = (board.nb_col, tuple(board.playable))
+        if shape not in self.shapes:
+            self.shapes[shape] = Random(len(self.shapes)).getrandbits(64)
+        return self.shapes[shape]
+
+    # Return the key of a board in the transposition table : its Zobrist
+    # hash mixed with the salt of its shape (see shape)
+    def key(self, board, shape) -> int:
+        return board.key() ^ shape
+
+    # Give a value to a board, without the points gained to reach it
+    # The higher, the better
+    def evaluate(self, board) -> float:
+        free = board.free_rows()
+        nb_row = len(free)
+
+        filled = 0
+        holes = 0
+        near = 0
+        col_free = {}
+        for r in range(nb_row):
+            f = free[r]
+            filled += board.filled[r].bit_count()
+
+            # A hole is a free cell without any free cell next to it
+            up = free[r-1] if r > 0 else 0
+            down = free[r+1] if r < nb_row-1 else 0
+            holes += (f & ~(f << 1) & ~(f >> 1) & ~up & ~down).bit_count()
+
+            if 0 < f.bit_count() <= 2:
+                near += 1
+            while f:
+                low = f & -f
+                col_free[low] = col_free.get(low, 0) + 1
+                f ^= low
+
+        near += sum(1 for n in col_free.values() if n <= 2)
+        fill = filled / max(1, sum(board.row_capacity))
+
+        w = self.weights
+        return w["near"] * near - w["holes"] * holes - w["fill"] * fill
+
+    # Give a value to a board, using the transposition table if it was already seen
+    def evaluate_cached(self, board, key) -> float:
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        value = self.evaluate(board)
+        self.cache[key] = value
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+        return value
+
+    # Choose the move to play in a game (see engine.py)
+    # Return a tuple (bloc, x, y), or None if no move is possible
+    def choose(self, state):
+        start = time.perf_counter()
+
+        if isinstance(state.board, BitBoard):
+            root = state.board.copy()
+        else:
+            root = BitBoard(state.grid())
+        blocs = list(dict.fromkeys(state.hand()))
+        shape = self.shape(root)
+
+        # Every element of the beam is a tuple (points gained, board, first move)
+        beam = [(0, root, None)]
+        best = None
+        for _ in range(self.depth):
+            children = []
+            seen = set()
+            for gained, board, first in beam:
+                free = board.free_rows()
+                for bloc in blocs:
+                    for x, y in origins_to_moves(legal_origins(free, bloc)):
+                        child = board.copy()
+                        child.place_bloc(bloc, x, y)
+                        points = 1
+                        cleared = -1
+                        while cleared != 0:
+                            cleared = child.clear_rows_and_col()
+                            points += cleared
+                        self.moves += 1
+
+                        key = self.key(child, shape)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+
+                        value = self.weights["score"] * (gained + points) + self.evaluate_cached(child, key)
+                        children.append((value, gained + points, child, first or (bloc, x, y)))
+
+            if not children:
+                break
+
+            children.sort(key=lambda child: child[0], reverse=True)
+            beam = [(gained, board, first) for value, gained, board, first in children[:self.width]]
+            best = children[0][3]
+
+        self.time += time.perf_counter() - start
+        return best
+
+    # Return the number of moves tried per second of search
+    def moves_per_sec(self) -> float:
+        return self.moves / self.time if self.time else 0.0
+
+# Let a bot play a game until it is over
+# "max_turns" stops the game after some turns, "on_turn" is called after every move
+# Return the score of the game
+def play_game(state, bot, max_turns=None, on_turn=None) -> int:
+    while not state.is_over():
+        if max_turns is not None and state.turn >= max_turns:
+            break
+
+        bloc, x, y = bot.choose(state)
+        state.play(bloc, x, y)
+        if on_turn is not None:
+            on_turn(state)
+
+    return state.score
+
+# Watch the bot play a game in the terminal
+# Stop with Ctrl+C
+def watch_bot(board, bloc_list, pol, engine="bitboard", bot=None, delay=0.3) -> None:
+    from board import print_turn, end_screen
+    from engine import GameState
+
+    if bot is None:
+        bot = Bot()
+    state = GameState(board, bloc_list, pol, engine=engine)
+
+    def show(state):
+        print_turn(state.score, state.grid(), state.hand(), pol)
+        time.sleep(delay)
+
+    try:
+        show(state)
+        play_game(state, bot, on_turn=show)
+    except KeyboardInterrupt:
+        pass
+
+    print(f"    The bot tried {bot.moves} moves in {bot.time:.2f}s ({bot.moves_per_sec():.0f} moves/sec)")
+    input("    (press Enter to continue)")
+    end_screen(state.score)
+
+def main() -> int:
+    from board import read_grid, get_block_list
+    from engine import GameState
+
+    parser = argparse.ArgumentParser(description="Let the bot play a game without any output.")
+    parser.add_argument("board", help="path to the board")
+    parser.add_argument("--pol", type=int, choices=(1, 2), default=2)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--depth", type=int, default=1)
+    parser.add_argument("--width", type=int, default=1)
+    parser.add_argument("--max-turns", type=int, default=1000)
+    args = parser.parse_args()
+
+    grid = read_grid(args.board)
+    if grid == []:
+        return 1
+
+    bot = Bot(args.depth, args.width)
+    state = GameState(grid, get_block_list(args.board), args.pol, args.seed)
+    play_game(state, bot, args.max_turns)
+
+    print(f"Score : {state.score} in {state.turn} turns ({state.lines} lines cleared)")
+    print(f"The bot tried {bot.moves} moves in {bot.time:.2f}s ({bot.moves_per_sec():.0f} moves/sec), "
+          f"{bot.hits} transposition table hits")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
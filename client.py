@@ -0,0 +1,235 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the terminal client of the game server (see server.py).
+# It shows the same menus and board as main.py, but the games are played by
+# the server : every move is sent to it, and the board it sends back is printed.
+# The games are saved by the server too, in its own folder, under the name
+# of the player (the user name by default) so that clients don't share a save.
+#
+# e.g. : py client.py --port 7420
+#        py client.py --name alice
+#        py client.py --unix /tmp/tetris.sock --latency
+
+import argparse
+import getpass
+import json
+import os
+import re
+import socket
+import sys
+import time
+
+import render
+from block_catalog import register_bloc
+from board import (CLS_COMMAND, better_int_input, end_screen, pause_menu, print_turn,
+                   select_board, select_policy, show_menu, show_rules)
+from coords import parse_coord
+from server import HOST, PORT
+
+# Error sent back by the server
+class ServerError(Exception):
+    pass
+
+# Connection to the game server
+class Connection:
+    # "unix" is the path of a Unix socket, if None the server is reached at host:port
+    def __init__(self, host=HOST, port=PORT, unix=None):
+        if unix is not None:
+            self.socket = socket.socket(socket.AF_UNIX)
+            self.socket.connect(unix)
+        else:
+            self.socket = socket.create_connection((host, port))
+        self.file = self.socket.makefile('rwb')
+
+        # Time between each request and its answer, in seconds
+        self.latency = []
+
+    # Send a request to the server and wait for its answer
+    # Return the answer, or raise a ServerError if the request failed
+    def request(self, op, **fields) -> dict:
+        start = time.perf_counter()
+        self.file.write(json.dumps(dict(fields, op=op), separators=(',', ':')).encode() + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        self.latency.append(time.perf_counter() - start)
+
+        if not line:
+            raise ConnectionError("The server closed the connection.")
+        answer = json.loads(line)
+        if not answer["ok"]:
+            raise ServerError(answer["error"])
+
+        return answer
+
+    def close(self) -> None:
+        self.file.close()
+        self.socket.close()
+
+# Return the board and the blocks of the hand of a state sent by the server
+# The blocks are found in the catalog from their cells
+def read_state(state) -> tuple:
+    grid = [list(row) for row in state["grid"]]
+    blocs = [register_bloc(cells) for cells in state["hand"]]
+    return grid, blocs
+
+# Return the save name used by default : the user name, with only the
+# characters allowed by the server
+def default_name() -> str:
+    try:
+        name = getpass.getuser()
+    except (OSError, KeyError):
+        name = ""
+    return re.sub(r"[^\w-]", "_", name)[:64] or "save"
+
+# Play a game hosted by the server, as in board.play_state
+# "answer" is the answer of the server to the request starting the game
+# "name" is the name the game is saved under
+def play_session(connection, answer, name) -> None:
+    session = answer["session"]
+    state = answer["state"]
+    render.diff_renderer.reset()
+
+    attempts = 0
+    while True:
+        grid, blocs = read_state(state)
+        pol = state["pol"]
+
+        # The game ends by itself once no block of the hand can be placed
+        if state["over"]:
+            connection.request("close", session=session)
+            print_turn(state["score"], grid, blocs, pol)
+            end_screen(state["score"])
+            break
+
+        # Print elements to the screen
+        print_turn(state["score"], grid, blocs, pol)
+
+        c = -2
+        blocs_available = list(range(1, len(blocs)+1))
+        while (c not in blocs_available) and (c != -1):
+            c = better_int_input("    [B] ")
+
+        if c == -1:
+            os.system(CLS_COMMAND)
+            q = pause_menu()
+            render.diff_renderer.reset()
+            if q == 1:
+                continue
+            elif q == 2:
+                connection.request("save", session=session, name=name)
+                connection.request("close", session=session)
+                break
+            elif q == 3:
+                connection.request("close", session=session)
+                end_screen(state["score"])
+                break
+
+        # Show where the block can be placed
+        if render.hints:
+            origins = connection.request("hints", session=session, bloc=c)["origins"]
+            print_turn(state["score"], render.hint_grid(grid, [int(mask, 16) for mask in origins]), blocs, pol)
+            print(f"    [B] {c}")
+
+        coord = None
+        while coord is None:
+            coord = parse_coord(input("    [Coord] "), len(grid[0]), len(grid))
+
+        x, y = coord
+
+        if attempts >= 3:
+            connection.request("close", session=session)
+            end_screen(state["score"])
+            break
+        answer = connection.request("place", session=session, bloc=c, x=x, y=y)
+        if answer["gained"] < 0:
+            attempts += 1
+            continue
+
+        state = answer["state"]
+        attempts = 0
+
+# "name" is the name the games are saved under
+# "engine" is the name of the board engine used by the server for the new
+# games, if None the server chooses it
+def main_menu(connection, name, engine=None) -> None:
+    while True:
+        choice = show_menu(save=connection.request("saved", name=name)["saved"])
+        os.system(CLS_COMMAND)
+
+        try:
+            if choice == 1: # Start Game
+                path = select_board()
+                if path == "":
+                    continue
+                os.system(CLS_COMMAND)
+                pol = select_policy()
+                if pol == 3:
+                    continue
+                # The server only plays on its own boards, given by their name
+                board = os.path.splitext(os.path.basename(path))[0]
+                fields = {"engine": engine} if engine is not None else {}
+                play_session(connection, connection.request("new", board=board, pol=pol, **fields), name)
+
+            elif choice == 2: # Resume Game
+                play_session(connection, connection.request("resume", name=name), name)
+
+            elif choice == 3: # Show Rules
+                show_rules()
+
+            elif choice == 4: # Watch the Bot
+                print("The bot can only be watched in main.py.")
+                input()
+
+            elif choice == 5: # Quit
+                print("Thank you for playing !")
+                return
+        except ServerError as error:
+            print(error)
+            input()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Play on the game server.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", default=None, help="path of the Unix socket of the server")
+    parser.add_argument("--name", default=default_name(), help="name the games are saved under")
+    parser.add_argument("--engine", default=None, help="board engine used by the server")
+    parser.add_argument("--render", choices=render.renderers, default=render.renderer)
+    parser.add_argument("--hints", action="store_true", default=render.hints,
+                        help="show where the chosen block can be placed")
+    parser.add_argument("--latency", action="store_true", help="print the time taken by the requests on exit")
+    args = parser.parse_args()
+    if not re.fullmatch(r"[\w-]{1,64}", args.name):
+        parser.error("the name can only contain letters, digits, '_' and '-' (64 at most)")
+    render.renderer = args.render
+    render.hints = args.hints
+
+    try:
+        connection = Connection(args.host, args.port, args.unix)
+    except OSError as error:
+        print(f"The server can't be reached : {error}")
+        return 1
+
+    try:
+        main_menu(connection, args.name, args.engine)
+    except ConnectionError as error:
+        print(error)
+        return 1
+    finally:
+        connection.close()
+        if args.latency and connection.latency:
+            latency = sorted(connection.latency)
+            sys.stderr.write(f"{len(latency)} requests : mean {sum(latency) / len(latency) * 1e3:.3f} ms, "
+                             f"median {latency[len(latency) // 2] * 1e3:.3f} ms, "
+                             f"max {latency[-1] * 1e3:.3f} ms\n")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the compact engine of the game, made to keep a lot of
+# games in memory at once (see server.py).
+# The cells of the board are stored in a single bytearray, one byte per cell,
+# row after row : b'0' for a void cell, b'1' for an empty cell and b'2' for
+# a full cell, as in the board files. Everything that never changes during a
+# game (the shape of the board, the capacities of the lines) is kept in a
+# Layout, shared by every game played on a board of the same shape.
+# A game then only owns its bytearray and a few integers, copying it is a
+# single copy of the bytearray, and the lines are checked for completion by
+# searching their bytes, without any counter.
+
+from array import array
+from collections import OrderedDict
+
+from block_catalog import catalog
+from board_cache import compile_board
+
+EMPTY, FULL = b"12"
+
+# Tables used with bytes.translate
+FREE_TABLE = bytes.maketrans(b"012", b"010")     # free cells to '1', others to '0'
+FULL_TABLE = bytes.maketrans(b"012", b"\0\0\1")  # full cells to 1, others to 0
+OPEN_TABLE = bytes.maketrans(b"012", b"\0\1\1")  # playable cells to 1, others to 0
+
+# Number of layouts kept
+LAYOUTS_SIZE = 16
+
+# What never changes on a board : its size, its empty cells and the capacities of its lines
+class Layout:
+    __slots__ = ("nb_row", "nb_col", "empty", "rows", "open_rows", "same_shape",
+                 "row_capacity", "col_capacity")
+
+    def __init__(self, data):
+        self.nb_row = data.nb_row
+        self.nb_col = data.nb_col
+        self.row_capacity = data.row_capacity
+        self.col_capacity = data.col_capacity
+
+        # The cells of the board once emptied
+        self.empty = b"".join("".join(line).encode() for line in data.grid).replace(b'2', b'1')
+
+        # Each row of the empty board as an integer (one byte per cell), and the
+        # same with only a 1 on its playable cells : adding a row of 0 and 1 to
+        # it fills the cells of the 1 (see CompactBoard.make_bloc_fall)
+        w = self.nb_col
+        self.rows = [int.from_bytes(self.empty[i*w:(i+1)*w], 'big') for i in range(self.nb_row)]
+        self.open_rows = [int.from_bytes(self.empty[i*w:(i+1)*w].translate(OPEN_TABLE), 'big')
+                          for i in range(self.nb_row)]
+        self.same_shape = array('b', (i > 0 and self.rows[i] == self.rows[i-1] for i in range(self.nb_row)))
+
+# Layouts of the last boards used, by the playable cells of their rows
+layouts = OrderedDict()
+
+# Return the layout of the data of a board, shared by every game played on
+# a board of the same shape
+def layout_of(data) -> Layout:
+    key = (data.nb_col, tuple(data.playable))
+    if key in layouts:
+        layouts.move_to_end(key)
+        return layouts[key]
+
+    layout = Layout(data)
+    layouts[key] = layout
+    if len(layouts) > LAYOUTS_SIZE:
+        layouts.popitem(last=False)
+
+    return layout
+
+class CompactBoard:
+    __slots__ = ("layout", "cells", "cleared", "dirty_rows", "dirty_cols")
+
+    # Create a compact board from a 2D matrix of the board
+    def __init__(self, grid):
+        data = compile_board(grid)
+        self.setup(layout_of(data), data)
+
+    # Create a compact board from the data of a board file (see board_cache.py)
+    # Return the compact board
+    @classmethod
+    def from_data(cls, data):
+        board = cls.__new__(cls)
+        board.setup(layout_of(data), data)
+        return board
+
+    # Set every attribute of the board from its layout and its data
+    def setup(self, layout, data) -> None:
+        self.layout = layout
+        self.cells = bytearray(b"".join("".join(line).encode() for line in data.grid))
+
+        # Number of lines cleared since the board was created
+        self.cleared = 0
+
+        # Lines that changed since the last call to clear_rows_and_col, as bitmasks
+        self.dirty_rows = (1 << layout.nb_row) - 1
+        self.dirty_cols = (1 << layout.nb_col) - 1
+
+    @property
+    def nb_row(self) -> int:
+        return self.layout.nb_row
+
+    @property
+    def nb_col(self) -> int:
+        return self.layout.nb_col
+
+    # Return a copy of the board
+    # Only the cells are copied, the layout is shared
+    def copy(self):
+        board = CompactBoard.__new__(CompactBoard)
+        board.layout = self.layout
+        board.cells = self.cells[:]
+        board.cleared = self.cleared
+        board.dirty_rows = self.dirty_rows
+        board.dirty_cols = self.dirty_cols
+        return board
+
+    # Return the cells of the board, as bytes
+    def to_bytes(self) -> bytes:
+        return bytes(self.cells)
+
+    # Create a compact board from the data of a board file and cells returned by to_bytes
+    # Return the compact board
+    @classmethod
+    def from_bytes(cls, data, cells):
+        if len(cells) != data.nb_row * data.nb_col:
+            raise ValueError("The cells don't match the size of the board.")
+
+        board = cls.from_data(data)
+        board.cells[:] = cells
+        return board
+
+    def to_grid(self) -> list:
+        w = self.layout.nb_col
+        return [list(self.cells[i*w:(i+1)*w].decode()) for i in range(self.layout.nb_row)]
+
+    # Return a list containing, for every row, the bitmask of its free cells
+    def free_rows(self) -> list:
+        w = self.layout.nb_col
+        if w == 0:
+            return [0] * self.layout.nb_row
+
+        free = self.cells.translate(FREE_TABLE)
+        return [int(free[i*w:(i+1)*w][::-1], 2) for i in range(self.layout.nb_row)]
+
+    # Check if the block at index "bloc" can be placed at an (x,y) location
+    # (x,y) refers to the bottom-left corner of the block
+    # Return True if the block can be placed, False otherwise
+    def valid_position(self, bloc, x, y) -> bool:
+        w = self.layout.nb_col
+        if x < 0 or y < 0 or x >= w or y >= self.layout.nb_row:
+            return False
+
+        for dy, dx in catalog[bloc].cells:
+            i, j = y - dy, x + dx
+            if i < 0 or j >= w or self.cells[i*w+j] != EMPTY:
+                return False
+
+        return True
+
+    # Place the block at index "bloc" at an (x,y) location
+    # NOTE: The position must have been checked with valid_position
+    def place_bloc(self, bloc, x, y) -> None:
+        w = self.layout.nb_col
+        for dy, dx in catalog[bloc].cells:
+            i, j = y - dy, x + dx
+            self.cells[i*w+j] = FULL
+            self.dirty_rows |= 1 << i
+            self.dirty_cols |= 1 << j
+
+    # Make the rows above the row at index i fall down 1 row
+    # A cell only falls if the cell under it is playable
+    def make_bloc_fall(self, i) -> None:
+        layout = self.layout
+        cells = self.cells
+        w = layout.nb_col
+        for r in range(i, 0, -1):
+            above = cells[(r-1)*w:r*w]
+            if layout.same_shape[r]:
+                cells[r*w:(r+1)*w] = above
+            else:
+                falling = int.from_bytes(above.translate(FULL_TABLE), 'big') & layout.open_rows[r]
+                cells[r*w:(r+1)*w] = (layout.rows[r] + falling).to_bytes(w, 'big')
+        cells[0:w] = layout.empty[0:w]
+
+    # Check if any row and column are completed. If it is the case, clear them
+    # Only the lines that changed since the last call are checked
+    # A line without any playable cell is never completed
+    # Return the score gained
+    def clear_rows_and_col(self) -> int:
+        layout = self.layout
+        cells = self.cells
+        w = layout.nb_col
+
+        full_rows = []
+        rows = self.dirty_rows
+        while rows:
+            low = rows & -rows
+            i = low.bit_length() - 1
+            if layout.row_capacity[i] and EMPTY not in cells[i*w:(i+1)*w]:
+                full_rows.append(i)
+            rows ^= low
+
+        full_cols = []
+        cols = self.dirty_cols
+        while cols:
+            low = cols & -cols
+            j = low.bit_length() - 1
+            if layout.col_capacity[j] and EMPTY not in cells[j::w]:
+                full_cols.append(j)
+            cols ^= low
+
+        self.dirty_rows = 0
+        self.dirty_cols = 0
+        self.cleared += len(full_rows) + len(full_cols)
+        score = 0
+
+        if full_rows:
+            for i in full_rows:
+                self.make_bloc_fall(i)
+                score += layout.row_capacity[i]
+
+            # Every row above the lowest cleared row may have changed
+            self.dirty_rows = (1 << (full_rows[-1] + 1)) - 1
+            self.dirty_cols = (1 << w) - 1
+
+        for j in full_cols:
+            cells[j::w] = cells[j::w].replace(b'2', b'1')
+            score += layout.col_capacity[j]
+
+        return score
+
@@ -0,0 +1,88 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the coordinates of the board.
+# Columns are named with lower case letters and rows with upper case letters,
+# like the columns of a spreadsheet : a, b, ..., z, aa, ab, ..., zz, aaa, ...
+# so boards of any size can be played. On boards bigger than 26 cells, the
+# labels of the columns are written vertically, one letter per line.
+# Coordinates can also be given as numbers, starting at 1.
+
+# Return the label of a column (lower case) or of a row (upper case)
+def label(i, upper=False) -> str:
+    first = 65 if upper else 97
+    text = ""
+    i += 1
+    while i > 0:
+        i -= 1
+        text = chr(first + i % 26) + text
+        i //= 26
+
+    return text
+
+# Return the number of letters of the longest label of "n" lines
+def label_width(n) -> int:
+    return len(label(max(n-1, 0)))
+
+# Return the index of a label (letters of any case, or a number starting at 1)
+# Return -1 if the text isn't a label
+def parse_label(text) -> int:
+    if text.isdigit():
+        return int(text) - 1
+    if not text.isascii() or not text.isalpha():
+        return -1
+
+    i = 0
+    for c in text.lower():
+        i = i * 26 + ord(c) - 96
+
+    return i - 1
+
+# Split the coordinates typed by the player into the column and the row
+# "aB", "ab", "aaAB", "AAab", "aa ab", "27,3" and "aa 3" are all accepted
+# Return a tuple (column, row), or None if the text can't be split
+def split_coord(text) -> tuple:
+    parts = text.replace(",", " ").split()
+    if len(parts) == 2:
+        return parts[0], parts[1]
+    if len(parts) != 1:
+        return None
+
+    text = parts[0]
+    if len(text) == 2:
+        return text[0], text[1]
+
+    # Without any space, the column and the row are told apart by the case
+    # of their letters, or by the change from letters to numbers
+    for i in range(1, len(text)):
+        a, b = text[i-1], text[i]
+        if a.islower() != b.islower() or a.isdigit() != b.isdigit():
+            return text[:i], text[i:]
+
+    return None
+
+# Convert the coordinates typed by the player to an (x,y) location
+# Return a tuple (x, y), or None if they aren't on a board of nb_col x nb_row cells
+def parse_coord(text, nb_col, nb_row) -> tuple:
+    parts = split_coord(text.strip())
+    if parts is None:
+        return None
+
+    x, y = parse_label(parts[0]), parse_label(parts[1])
+    if x < 0 or y < 0 or x >= nb_col or y >= nb_row:
+        return None
+
+    return x, y
+
+# Return the lines of the labels of the columns, written vertically
+# "margin" is the text written before each line
+def column_header(nb_col, margin) -> list:
+    width = label_width(nb_col)
+    labels = [label(i).rjust(width) for i in range(nb_col)]
+
+    return [margin + "".join(text[k] + " " for text in labels) for k in range(width)]
@@ -0,0 +1,204 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the game engine, that applies the rules of the game
+# without reading the keyboard or printing anything.
+# The terminal game in board.py is built on top of it, and it can also be
+# used to play games from a program (simulations, bots, ...).
+
+from random import Random, randrange
+from struct import Struct
+
+from bitboard import BitBoard
+from board import make_board, select_bloc
+from board_cache import compile_board
+from moves import MoveCache, origins_to_moves
+
+# Header of a game state saved with GameState.to_bytes : the seed, the turn,
+# the score, the lines cleared, the policy and the size of the board
+STATE_HEADER = Struct("<QQQQBII")
+
+# Return the random number generator used to draw the blocks of a turn
+# Each turn has its own generator, built from the seed of the game and the
+# turn number, so a game can be replayed from any turn
+def turn_rng(seed, turn) -> Random:
+    return Random((seed << 32) | turn)
+
+class GameState:
+    __slots__ = ("board", "engine", "bloc_list", "pol", "seed", "score", "turn", "lines",
+                 "blocs", "moves", "moves_turn")
+
+    # Start a new game
+    # "grid" is the 2D matrix of the board (or the data of a board file, see
+    # board_cache.py), "bloc_list" the blocks of the board,
+    # "pol" the policy (see select_bloc) and "engine" the name of the board engine
+    # If "seed" is None, a random seed is chosen
+    def __init__(self, grid, bloc_list, pol, seed=None, engine="bitboard"):
+        self.board = make_board(grid, engine)
+        if self.board is None:
+            raise ValueError(f"No engine named {engine}.")
+
+        self.engine = engine
+        self.bloc_list = bloc_list
+        self.pol = pol
+        self.seed = seed if seed is not None else randrange(1 << 32)
+
+        self.score = 0
+        self.turn = 0
+        self.lines = 0
+        self.blocs = select_bloc(bloc_list, pol, turn_rng(self.seed, self.turn))
+
+        # Valid origins of the blocks, updated after every move
+        self.moves = MoveCache()
+        self.moves_turn = -1
+
+    # Return the cache of the valid origins of the blocks, up to date with the board
+    def move_cache(self) -> MoveCache:
+        if self.moves_turn != self.turn:
+            self.moves.update(self.board.free_rows())
+            self.moves_turn = self.turn
+
+        return self.moves
+
+    # Return a copy of the game, that can be played without changing this one
+    # The board is copied by the engine if it can, the blocks are shared
+    def copy(self):
+        state = GameState.__new__(GameState)
+        for name in GameState.__slots__:
+            setattr(state, name, getattr(self, name))
+
+        if hasattr(self.board, "copy"):
+            state.board = self.board.copy()
+        else:
+            state.board = make_board([line[:] for line in self.grid()], self.engine)
+        state.moves = MoveCache()
+        state.moves_turn = -1
+        return state
+
+    # Return the list of blocks available this turn
+    def hand(self) -> list:
+        return self.blocs
+
+    # Return the 2D matrix of the board
+    def grid(self) -> list:
+        return self.board.to_grid()
+
+    # Return the valid origins of a block this turn, one bitmask of the valid x
+    # per row (see moves.legal_origins), in an array (or a list on very wide boards)
+    # They are kept until the board changes, then only updated around the rows that changed
+    def origins(self, bloc):
+        return self.move_cache().get(bloc)
+
+    # Return a list of every (bloc, x, y) move possible this turn
+    def legal_moves(self) -> list:
+        cache = self.move_cache()
+        moves = []
+        for bloc in dict.fromkeys(self.blocs):
+            for x, y in origins_to_moves(cache.get(bloc)):
+                moves.append((bloc, x, y))
+
+        return moves
+
+    # Check if a block of the hand can be placed at an (x,y) location
+    # Return True if the move is possible, False otherwise
+    def is_legal(self, bloc, x, y) -> bool:
+        return bloc in self.blocs and self.board.valid_position(bloc, x, y)
+
+    # Place a block of the hand at an (x,y) location, clear the completed
+    # lines and draw the blocks of the next turn
+    # Return the points gained, or -1 if the move isn't possible
+    def play(self, bloc, x, y) -> int:
+        if not self.is_legal(bloc, x, y):
+            return -1
+
+        self.board.place_bloc(bloc, x, y)
+        gained = 1
+        cleared = self.board.cleared
+
+        points = -1
+        while points != 0:
+            points = self.board.clear_rows_and_col()
+            gained += points
+
+        self.score += gained
+        self.lines += self.board.cleared - cleared
+        self.turn += 1
+        self.blocs = select_bloc(self.bloc_list, self.pol, turn_rng(self.seed, self.turn))
+
+        return gained
+
+    # Check if the game is over, that is if no block of the hand (or of the
+    # whole list, with policy 1) can be placed
+    # Return True if the game is over, False otherwise
+    def is_over(self) -> bool:
+        return not self.move_cache().any_move(self.blocs)
+
+    # Return the bitmask of the filled cells of every row (bit j for the column j)
+    def filled_rows(self) -> list:
+        if isinstance(self.board, BitBoard):
+            return self.board.filled[:]
+        return compile_board(self.grid()).filled
+
+    # Return the state of the game as a dictionary that can be saved as JSON
+    # The filled cells are given as one hexadecimal bitmask per row
+    def snapshot(self) -> dict:
+        return {
+            "turn": self.turn,
+            "score": self.score,
+            "lines": self.lines,
+            "filled": [format(row, 'x') for row in self.filled_rows()],
+        }
+
+    # Go back to a state returned by snapshot
+    # NOTE: The game must have been started on the same board
+    def restore(self, snapshot) -> None:
+        filled = [int(row, 16) for row in snapshot["filled"]]
+        self.restore_rows(snapshot["turn"], snapshot["score"], snapshot["lines"], filled)
+
+    # Go back to a turn, with the filled cells of every row given as bitmasks
+    def restore_rows(self, turn, score, lines, filled) -> None:
+        grid = [line[:] for line in self.grid()]
+        for line, row in zip(grid, filled):
+            for j in range(len(line)):
+                if line[j] != '0':
+                    line[j] = '2' if row >> j & 1 else '1'
+
+        self.board = make_board(grid, self.engine)
+        self.moves_turn = -1
+        self.turn = turn
+        self.score = score
+        self.lines = lines
+        self.blocs = select_bloc(self.bloc_list, self.pol, turn_rng(self.seed, self.turn))
+
+    # Return the state of the game as bytes : STATE_HEADER, then the filled
+    # cells of every row, one bit per cell
+    # The board and the blocks aren't saved, see from_bytes
+    def to_bytes(self) -> bytes:
+        nb_row, nb_col = self.board.nb_row, self.board.nb_col
+        row_bytes = (nb_col + 7) // 8
+        header = STATE_HEADER.pack(self.seed, self.turn, self.score, self.lines, self.pol, nb_row, nb_col)
+        return header + b"".join(row.to_bytes(row_bytes, 'little') for row in self.filled_rows())
+
+    # Rebuild a game from the bytes returned by to_bytes
+    # "grid", "bloc_list" and "engine" are the same as for a new game, and
+    # must be the ones of the game that was saved
+    # Return the GameState
+    @classmethod
+    def from_bytes(cls, grid, bloc_list, data, engine="bitboard"):
+        seed, turn, score, lines, pol, nb_row, nb_col = STATE_HEADER.unpack_from(data)
+        state = cls(grid, bloc_list, pol, seed, engine)
+        row_bytes = (nb_col + 7) // 8
+        if (nb_row, nb_col) != (state.board.nb_row, state.board.nb_col) \
+                or len(data) != STATE_HEADER.size + nb_row * row_bytes:
+            raise ValueError("The state doesn't match the size of the board.")
+
+        start = STATE_HEADER.size
+        filled = [int.from_bytes(data[start+i*row_bytes:start+(i+1)*row_bytes], 'little')
+                  for i in range(nb_row)]
+        state.restore_rows(turn, score, lines, filled)
+        return state
@@ -0,0 +1,164 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the journal of the games, used to save and resume them.
+# A journal is a text file with one JSON record per line, only ever appended :
+#   - "game" : the board file, the blocks (with their shapes), the policy,
+#     the seed and the engine
+#   - "move" : a block placed at an (x,y) location, written as soon as it is played
+#   - "snapshot" : every few turns, the turn, the score, the lines cleared and
+#     the filled cells of the board (one hexadecimal bitmask per row)
+#   - "end" : the final score, once the game is over
+# Saving a turn is a single small append, and nothing is lost if the game
+# stops without being saved. To resume a game, the last snapshot is loaded
+# and only the moves played after it are replayed.
+
+import json
+import os
+
+from block_catalog import catalog, canonical_cells, register_bloc
+from board_cache import load_board
+from engine import GameState
+
+# Default journal of the terminal game
+JOURNAL_PATH = "save.journal"
+
+class Journal:
+    # Open a journal
+    # A snapshot is written every "snapshot_every" turns
+    def __init__(self, path=JOURNAL_PATH, snapshot_every=50):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.file = None
+
+    # Write a record at the end of the journal
+    def append(self, record) -> None:
+        self.file.write(json.dumps(record, separators=(',', ':')) + "\n")
+        self.file.flush()
+
+    # Start the journal of a new game, replacing the last one
+    # "board_path" is the path of the board the game is played on
+    def start(self, state, board_path) -> None:
+        self.close()
+        self.file = open(self.path, 'w')
+        self.append({
+            "type": "game",
+            "board": board_path,
+            "blocs": list(state.bloc_list),
+            "shapes": [canonical_cells(catalog[bloc].cells) for bloc in state.bloc_list],
+            "pol": state.pol,
+            "seed": state.seed,
+            "engine": state.engine,
+        })
+
+    # Continue the journal of a game loaded with load_journal
+    # A last line cut in the middle is removed first
+    def reopen(self) -> None:
+        self.close()
+        with open(self.path, 'rb+') as file:
+            data = file.read()
+            file.truncate(data.rfind(b"\n") + 1)
+        self.file = open(self.path, 'a')
+
+    # Write a move that was just played
+    def record(self, state, bloc, x, y) -> None:
+        self.append({"type": "move", "bloc": bloc, "x": x, "y": y})
+        if state.turn % self.snapshot_every == 0:
+            self.append(dict(state.snapshot(), type="snapshot"))
+
+    # Write the end of the game, which can't be resumed anymore
+    def end(self, state) -> None:
+        self.append({"type": "end", "score": state.score, "turn": state.turn})
+        self.close()
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+# Read every record of a journal
+# A last line cut in the middle (if the game stopped while writing it) is ignored
+# Return the list of records
+def read_records(path) -> list:
+    records = []
+    with open(path, 'r') as file:
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+
+    return records
+
+# Return the blocks of the game of a journal
+# Blocks loaded from files (see block_sets.py) can have another index in the
+# catalog of this program, so they are found again from their shapes
+# Return a tuple (list of the blocks, dictionary giving the index in this
+# program of each index written in the journal)
+def header_blocs(header) -> tuple:
+    if "shapes" not in header:
+        return header["blocs"], {bloc: bloc for bloc in header["blocs"]}
+
+    bloc_list = [register_bloc(shape) for shape in header["shapes"]]
+    return bloc_list, dict(zip(header["blocs"], bloc_list))
+
+# Check if a journal contains a game that can be resumed
+# Only the first line and the end of the file are read if possible, as the
+# main menu checks it every time it is shown
+# Return True if it does, False otherwise
+def can_resume(path=JOURNAL_PATH) -> bool:
+    if not os.path.isfile(path):
+        return False
+
+    with open(path, 'rb') as file:
+        first = file.readline()
+        file.seek(0, os.SEEK_END)
+        file.seek(max(0, file.tell() - 4096))
+        end = file.read()
+
+    # The last complete line is the last record, a line cut in the middle is ignored
+    # If it is longer than what was read, the whole journal is read
+    try:
+        header = json.loads(first)
+        last = json.loads(end.split(b"\n")[-2])
+    except (ValueError, IndexError):
+        records = read_records(path)
+        return bool(records) and records[0]["type"] == "game" and records[-1]["type"] != "end"
+
+    return header["type"] == "game" and last["type"] != "end"
+
+# Rebuild a game from a journal, from its last snapshot
+# "engine" replaces the engine written in the journal, if given
+# Return the GameState, or None if the journal can't be read
+def load_journal(path=JOURNAL_PATH, engine=None):
+    records = read_records(path)
+    if not records or records[0]["type"] != "game":
+        return None
+
+    header = records[0]
+    data = load_board(header["board"])
+    if data is None or data.nb_row == 0:
+        return None
+
+    bloc_list, blocs = header_blocs(header)
+    state = GameState(data, bloc_list, header["pol"], header["seed"], engine or header["engine"])
+
+    # Only the moves after the last snapshot are replayed
+    start = 1
+    for i in range(len(records)-1, 0, -1):
+        if records[i]["type"] == "snapshot":
+            state.restore(records[i])
+            start = i + 1
+            break
+
+    for record in records[start:]:
+        if record["type"] == "move":
+            if state.play(blocs.get(record["bloc"], -1), record["x"], record["y"]) < 0:
+                return None
+
+    return state
@@ -9,17 +9,25 @@
 # This file serves as the starting point of the game.
 
 from board import *
+from bot import watch_bot
+from journal import can_resume
+from board_cache import load_board
+import profiling
 
-import os 
+import os
+import argparse
 if os.name == "nt": CLS_COMMAND = "cls"
 if os.name == "posix": CLS_COMMAND = "clear"
 
-def main():
+# "engine" is the name of the board engine used during the games
+def main(engine="auto"):
 
     while True:
         choice = 0
         path = ""
         pol = 2
+        watch = False
+        resume = False
         
         # Main Menu loop
         game_started = False
@@ -38,27 +46,69 @@ def main():
                 game_started = True
 
             elif choice == 2: # Resume Game
-                path = "save.txt"
+                if can_resume():
+                    resume = True
+                else:
+                    path = "save.txt"
                 game_started = True
 
             elif choice == 3: # Show Rules
                 show_rules()
 
-            elif choice == 4: # Quit
+            elif choice == 4: # Watch the Bot
+                path = select_board()
+                if path == "":
+                    continue
+                os.system(CLS_COMMAND)
+                pol = select_policy()
+                if pol == 3:
+                    continue
+
+                watch = True
+                game_started = True
+
+            elif choice == 5: # Quit
                 print("Thank you for playing !")
                 return 0
             
             os.system(CLS_COMMAND)
 
+        if resume:
+            resume_game(engine)
+            continue
+
         # Setup the game
-        board = read_grid(path)
+        board = load_board(path)
         current_block_list = get_block_list(path)
 
-        if board == []: # Quit the game if the board doesn't exist
+        if board is None or board.nb_row == 0: # Quit the game if the board doesn't exist
+            print(f"No grid exists at {path}.")
             return 1
         
         # Start of the game
-        game(board, current_block_list, pol)    
+        if watch:
+            watch_bot(board, current_block_list, pol, engine)
+        else:
+            game(board, current_block_list, pol, engine, path)
 
 if __name__=="__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engine", choices=list(engines), default="auto",
+                        help="board engine used to apply the rules")
+    parser.add_argument("--render", choices=render.renderers, default=render.renderer,
+                        help="\"frame\" writes each frame at once, \"diff\" only the cells that changed, "
+                             "\"legacy\" prints every cell")
+    parser.add_argument("--hints", action="store_true", default=render.hints,
+                        help="show where the chosen block can be placed")
+    parser.add_argument("--profile", choices=profiling.modes, default=None,
+                        help="measure the phases of each turn, and write a summary (and a profile) on exit")
+    parser.add_argument("--profile-output", default="", help="file the profile is written to")
+    args = parser.parse_args()
+    render.renderer = args.render
+    render.hints = args.hints
+    if args.profile is not None:
+        profiling.enable(args.profile, args.profile_output)
+    else:
+        profiling.enable_from_env()
+
+    main(args.engine)
@@ -0,0 +1,182 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the functions finding where a block can be placed.
+# They work on any board engine, through its free_rows method, that gives
+# for every row a bitmask of its free cells (bit j set if the cell in
+# column j is a '1').
+# For a row y, the origins x where the block fits are found by shifting the
+# free cells of every row covered by the block, and intersecting them :
+# that is one AND per cell of the block instead of one valid_position per cell.
+
+from array import array
+
+from block_catalog import catalog
+
+# Find the valid origins of a block for every row of the board
+# "free" is the list returned by the free_rows method of a board
+# Return a list containing, for every row y, a bitmask of the valid x
+def legal_origins(free, bloc) -> list:
+    cells = catalog[bloc].cells
+    height = catalog[bloc].height
+    origins = [0] * len(free)
+
+    for y in range(height-1, len(free)):
+        mask = -1
+        for dy, dx in cells:
+            mask &= free[y-dy] >> dx
+            if not mask:
+                break
+        origins[y] = mask
+
+    return origins
+
+# Convert the bitmasks returned by legal_origins to a list of (x,y) locations
+# Return the list of locations, sorted by row then by column
+def origins_to_moves(origins) -> list:
+    moves = []
+    for y, mask in enumerate(origins):
+        while mask:
+            low = mask & -mask
+            moves.append((low.bit_length()-1, y))
+            mask ^= low
+
+    return moves
+
+# Find every location where a block can be placed on a board
+# "bloc" is the index of the block in "catalog"
+# Return a list of (x,y) locations, (x,y) being the bottom-left corner of the block
+def legal_moves(board, bloc) -> list:
+    return origins_to_moves(legal_origins(board.free_rows(), bloc))
+
+# Find every location where each block of a hand can be placed on a board
+# "hand" is a list of block indexes, like the one returned by select_bloc
+# Return a dictionary associating each block to its list of (x,y) locations
+def hand_moves(board, hand) -> dict:
+    free = board.free_rows()
+    moves = {}
+    for bloc in hand:
+        if bloc not in moves:
+            moves[bloc] = origins_to_moves(legal_origins(free, bloc))
+
+    return moves
+
+# Count the locations where a block can be placed on a board
+# Return the number of locations
+def count_moves(board, bloc) -> int:
+    return sum(mask.bit_count() for mask in legal_origins(board.free_rows(), bloc))
+
+# Find the valid origins of a block for a single row y
+# Return the bitmask of the valid x
+def row_origins(free, cells, y) -> int:
+    mask = -1
+    for dy, dx in cells:
+        mask &= free[y-dy] >> dx
+        if not mask:
+            break
+
+    return mask
+
+# Return rows of bitmasks in an array of 64 bits integers, that takes less
+# memory than a list, or the list itself if a bitmask doesn't fit in it
+def compact_rows(rows):
+    try:
+        return array('Q', rows)
+    except OverflowError:
+        return rows
+
+# Cache of the valid origins of the blocks on a board that changes
+# After a move, only the rows of the board whose free cells changed are
+# found. The origins of a cached block are then only computed again for the
+# rows where it could cover one of them, the next time the block is used
+class MoveCache:
+    __slots__ = ("free", "entries")
+
+    def __init__(self):
+        self.free = None
+
+        # For each block : its valid origins (as returned by legal_origins),
+        # the number of rows having at least one valid origin, and the bitmask
+        # of the rows of the board that changed since the origins were computed
+        self.entries = {}
+
+    # Give the free cells of the board (the list returned by its free_rows method)
+    # Must be called after every move, before using the cache
+    def update(self, free) -> None:
+        free = compact_rows(free)
+        if self.free is None or len(free) != len(self.free):
+            self.entries.clear()
+        else:
+            changed = 0
+            for r, (new, old) in enumerate(zip(free, self.free)):
+                if new != old:
+                    changed |= 1 << r
+            if changed:
+                for bloc, entry in list(self.entries.items()):
+                    entry[2] |= changed
+
+                    # When most of the board changed, the origins are computed again entirely
+                    if entry[2].bit_count() > len(free) // 2:
+                        del self.entries[bloc]
+
+        self.free = free
+
+    # Compute the origins of a block again, on the rows affected by the changed rows
+    def refresh(self, bloc, entry) -> None:
+        free = self.free
+        cells = catalog[bloc].cells
+        height = catalog[bloc].height
+
+        rows = set()
+        changed = entry[2]
+        while changed:
+            low = changed & -changed
+            r = low.bit_length() - 1
+            rows.update(range(max(r, height-1), min(r+height, len(free))))
+            changed ^= low
+        entry[2] = 0
+
+        origins = entry[0]
+        for y in rows:
+            mask = row_origins(free, cells, y)
+            if bool(mask) != bool(origins[y]):
+                entry[1] += 1 if mask else -1
+            origins[y] = mask
+
+    # Return the entry of a block, up to date with the board
+    def entry(self, bloc) -> list:
+        entry = self.entries.get(bloc)
+        if entry is None:
+            origins = compact_rows(legal_origins(self.free, bloc))
+            entry = [origins, sum(1 for mask in origins if mask), 0]
+            self.entries[bloc] = entry
+        elif entry[2]:
+            self.refresh(bloc, entry)
+
+        return entry
+
+    # Return the valid origins of a block, for every row (see legal_origins)
+    def get(self, bloc):
+        return self.entry(bloc)[0]
+
+    # Check if a block can be placed somewhere on the board
+    # Return True if it can, False otherwise
+    def can_place(self, bloc) -> bool:
+        return self.entry(bloc)[1] > 0
+
+    # Check if at least one block of a list can be placed on the board
+    # The blocks already cached are checked first, as only the rows that
+    # changed have to be looked at, and the search stops at the first block that fits
+    # Return True if a block can be placed, False otherwise
+    def any_move(self, blocs) -> bool:
+        blocs = sorted(dict.fromkeys(blocs), key=lambda bloc: bloc not in self.entries)
+        for bloc in blocs:
+            if self.can_place(bloc):
+                return True
+
+        return False
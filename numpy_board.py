@@ -0,0 +1,109 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the NumPy engine of the game.
+# The board is stored as two 2D boolean arrays, "playable" and "filled",
+# so that completed rows and columns are found with one reduction on the
+# whole board, and cleared with masked assignments.
+# NOTE: This engine is only available if NumPy is installed
+
+import numpy as np
+
+from block_catalog import catalog
+
+# Convert a compiled block to two arrays containing the offsets of its cells
+# "dy" is the number of rows above the bottom of the block,
+# "dx" is the number of columns right of the left of the block
+def bloc_to_offsets(bloc) -> tuple:
+    dy = [dy for dy, dx in bloc.cells]
+    dx = [dx for dy, dx in bloc.cells]
+
+    return np.array(dy, dtype=np.intp), np.array(dx, dtype=np.intp)
+
+# Offsets of every block of the game, in the same order as "catalog"
+# Blocks added to the catalog later are added by update_offsets
+bloc_offsets = [bloc_to_offsets(bloc) for bloc in catalog]
+
+def update_offsets() -> None:
+    for bloc in catalog[len(bloc_offsets):]:
+        bloc_offsets.append(bloc_to_offsets(bloc))
+
+class NumpyBoard:
+    # Create a NumPy board from a 2D matrix of the board
+    def __init__(self, grid):
+        update_offsets()
+        cells = np.array(grid, dtype='<U1').reshape(len(grid), -1)
+        self.nb_row, self.nb_col = cells.shape
+
+        self.playable = cells != '0'
+        self.filled = cells == '2'
+
+        # Number of playable cells in each row and column,
+        # that is the number of points given when the line is cleared
+        self.row_capacity = self.playable.sum(axis=1)
+        self.col_capacity = self.playable.sum(axis=0)
+
+        # Number of lines cleared since the board was created
+        self.cleared = 0
+
+    # Convert the NumPy board back to a 2D matrix of the board
+    def to_grid(self) -> list:
+        cells = np.where(self.filled, '2', '1')
+        cells[~self.playable] = '0'
+        return cells.tolist()
+
+    # Return a list containing, for every row, the bitmask of its free cells
+    def free_rows(self) -> list:
+        packed = np.packbits(self.playable & ~self.filled, axis=1, bitorder='little')
+        return [int.from_bytes(row.tobytes(), 'little') for row in packed]
+
+    # Check if the block at index "bloc" can be placed at an (x,y) location
+    # (x,y) refers to the bottom-left corner of the block
+    # Return True if the block can be placed, False otherwise
+    def valid_position(self, bloc, x, y) -> bool:
+        if x < 0 or y < 0 or x >= self.nb_col or y >= self.nb_row:
+            return False
+
+        dy, dx = bloc_offsets[bloc]
+        rows = y - dy
+        cols = x + dx
+        if rows.min() < 0 or cols.max() >= self.nb_col:
+            return False
+
+        return bool((self.playable[rows, cols] & ~self.filled[rows, cols]).all())
+
+    # Place the block at index "bloc" at an (x,y) location
+    # NOTE: The position must have been checked with valid_position
+    def place_bloc(self, bloc, x, y) -> None:
+        dy, dx = bloc_offsets[bloc]
+        self.filled[y - dy, x + dx] = True
+
+    # Make the rows above the row at index i fall down 1 row
+    # A cell only falls if the cell under it is playable
+    def make_bloc_fall(self, i) -> None:
+        self.filled[1:i+1] = self.filled[:i] & self.playable[1:i+1]
+        self.filled[0] = False
+
+    # Check if any row and column are completed. If it is the case, clear them
+    # A line without any playable cell is never completed
+    # Return the score gained
+    def clear_rows_and_col(self) -> int:
+        free = self.playable & ~self.filled
+        full_rows = np.flatnonzero(~free.any(axis=1) & (self.row_capacity > 0))
+        full_cols = ~free.any(axis=0) & (self.col_capacity > 0)
+
+        score = int(self.row_capacity[full_rows].sum() + self.col_capacity[full_cols].sum())
+        self.cleared += len(full_rows) + int(full_cols.sum())
+
+        # Rows are cleared from top to bottom, like the other engines
+        for r in full_rows:
+            self.make_bloc_fall(r)
+
+        self.filled[:, full_cols] = False
+
+        return score
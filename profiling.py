@@ -0,0 +1,263 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the profiling mode of the game.
+# When it is enabled (TETRIS_PROFILE environment variable, or main.py --profile),
+# the functions used during a turn are wrapped to measure the time spent in
+# each phase (input, validation, placement, clearing, gravity, rendering and
+# saving) and to count what they do. Nothing is wrapped when it is disabled,
+# so the game runs exactly as before.
+# On exit, one of these is written :
+#   - "summary" : a table of the phases and counters, printed on stderr
+#   - "cprofile" : the summary, and the cProfile stats in a file (see pstats)
+#   - "collapsed" : the summary, and the time spent in every stack of calls in
+#     a file, one "f1;f2;f3 microseconds" line per stack (for flamegraph tools)
+#
+# e.g. : TETRIS_PROFILE=collapsed py main.py
+#        py main.py --profile cprofile --profile-output game.prof
+
+import atexit
+import os
+import sys
+import time
+from functools import wraps
+
+modes = ("summary", "cprofile", "collapsed")
+default_outputs = {"summary": "", "cprofile": "tetris.prof", "collapsed": "tetris.collapsed"}
+
+# Phases of a turn, in the order of the summary
+phases = ("input", "validation", "placement", "clearing", "gravity", "rendering", "saving")
+
+# Time spent in each phase, and number of times each phase was entered
+timers = dict.fromkeys(phases, 0.0)
+calls = dict.fromkeys(phases, 0)
+
+# Counters of what was done during the game
+counters = {
+    "turns": 0,
+    "validation calls": 0,
+    "cells scanned": 0,
+    "board copies": 0,
+    "lines cleared": 0,
+    "render bytes": 0,
+}
+
+# Phases being measured, innermost last : [phase, start, time of the inner phases]
+stack = []
+
+enabled = False
+
+# Wrap a function so the time spent in it is added to a phase
+# The time spent in an inner phase (gravity during clearing) only counts for the inner one
+# "count" is called with the arguments and the result, to update the counters
+def timed(function, phase, count=None):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        stack.append([phase, time.perf_counter(), 0.0])
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            start, inner = stack.pop()[1:]
+            elapsed = time.perf_counter() - start
+            timers[phase] += elapsed - inner
+            calls[phase] += 1
+            if stack:
+                stack[-1][2] += elapsed
+        if count is not None:
+            count(args, result)
+        return result
+
+    return wrapper
+
+# Wrap a function only to update the counters
+def counted(function, count):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        result = function(*args, **kwargs)
+        count(args, result)
+        return result
+
+    return wrapper
+
+# Stream counting the characters written to the terminal
+class CountingStream:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        counters["render bytes"] += len(text.encode(errors="replace"))
+        return self.stream.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+# Wrap the rendering of a turn : time it, and count the bytes written
+def timed_render(function):
+    render = timed(function, "rendering")
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        stdout = sys.stdout
+        sys.stdout = CountingStream(stdout)
+        try:
+            return render(*args, **kwargs)
+        finally:
+            sys.stdout = stdout
+
+    return wrapper
+
+def count_validation(args, result) -> None:
+    from block_catalog import catalog
+    counters["validation calls"] += 1
+    counters["cells scanned"] += catalog[args[1]].size
+
+def count_copy(args, result) -> None:
+    counters["board copies"] += 1
+
+def count_turn(args, result) -> None:
+    if result >= 0:
+        counters["turns"] += 1
+
+# Wrap the clearing of a board engine, counting the lines cleared
+def timed_clear(function):
+    @wraps(function)
+    def wrapper(self):
+        cleared = self.cleared
+        result = function(self)
+        counters["lines cleared"] += self.cleared - cleared
+        return result
+
+    return timed(wrapper, "clearing")
+
+# Profiler writing the time spent in every stack of calls, as collapsed stacks
+class StackProfiler:
+    def __init__(self):
+        self.stacks = {}
+        self.names = []
+        self.starts = []
+
+    def enable(self) -> None:
+        sys.setprofile(self.trace)
+
+    def disable(self) -> None:
+        sys.setprofile(None)
+
+    def trace(self, frame, event, arg) -> None:
+        now = time.perf_counter()
+        if event == "call" or event == "c_call":
+            if event == "call":
+                code = frame.f_code
+                name = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            else:
+                name = getattr(arg, "__qualname__", repr(arg))
+            self.pause(now)
+            self.names.append(name)
+            self.starts.append(now)
+        elif self.names and (event == "return" or event == "c_return" or event == "c_exception"):
+            self.pause(now)
+            self.names.pop()
+            self.starts.pop()
+            if self.starts:
+                self.starts[-1] = now
+
+    # Add the time since the last event to the stack being run
+    def pause(self, now) -> None:
+        if self.names:
+            key = ";".join(self.names)
+            self.stacks[key] = self.stacks.get(key, 0.0) + now - self.starts[-1]
+            self.starts[-1] = now
+
+    def dump(self, path) -> None:
+        with open(path, 'w') as file:
+            for key, seconds in self.stacks.items():
+                micros = round(seconds * 1e6)
+                if micros > 0:
+                    file.write(f"{key} {micros}\n")
+
+# Return the summary of the profiling, as a table
+def summary() -> str:
+    turns = max(counters["turns"], 1)
+    total = sum(timers.values()) or 1.0
+
+    lines = [f"{'PHASE':<14}{'CALLS':>10}{'TOTAL (ms)':>14}{'PER TURN (ms)':>16}{'SHARE':>9}"]
+    for phase in phases:
+        lines.append(f"{phase:<14}{calls[phase]:>10}{timers[phase]*1e3:>14.2f}"
+                     f"{timers[phase]*1e3/turns:>16.3f}{timers[phase]/total:>9.1%}")
+    lines.append("")
+    lines.append(f"{'COUNTER':<24}{'TOTAL':>14}{'PER TURN':>14}")
+    for name, value in counters.items():
+        lines.append(f"{name:<24}{value:>14}{value/turns:>14.1f}")
+
+    return "\n".join(lines) + "\n"
+
+# Write the results of the profiling, called on exit
+def report(mode, output, profiler) -> None:
+    if profiler is not None:
+        profiler.disable()
+        if mode == "cprofile":
+            profiler.dump_stats(output)
+        else:
+            profiler.dump(output)
+
+    sys.stderr.write("\n" + summary())
+    if profiler is not None:
+        sys.stderr.write(f"\nProfile written to {output}\n")
+
+# Enable the profiling : wrap the functions of the game and start the profiler
+# "mode" is one of "modes", "output" the file written on exit (a default one if empty)
+def enable(mode="summary", output="") -> None:
+    global enabled
+    if enabled:
+        return
+    if mode not in modes:
+        raise ValueError(f"No profiling mode named {mode}.")
+
+    import board
+    import journal
+    from engine import GameState
+
+    # Each phase is timed at a single level, so that its calls are only counted once :
+    # the input through the input of board.py (used by better_int_input), and
+    # the validation through the engines (used by GameState.is_legal)
+    board.print_turn = timed_render(board.print_turn)
+    board.input = timed(input, "input")
+    GameState.play = counted(GameState.play, count_turn)
+    journal.Journal.record = timed(journal.Journal.record, "saving")
+
+    for engine in board.engines.values():
+        if not isinstance(engine, type):
+            continue
+        engine.valid_position = timed(engine.valid_position, "validation", count_validation)
+        engine.place_bloc = timed(engine.place_bloc, "placement")
+        engine.clear_rows_and_col = timed_clear(engine.clear_rows_and_col)
+        engine.make_bloc_fall = timed(engine.make_bloc_fall, "gravity")
+        if engine is not board.GridBoard:
+            engine.to_grid = timed(engine.to_grid, "rendering", count_copy)
+        if hasattr(engine, "copy"):
+            engine.copy = timed(engine.copy, "placement", count_copy)
+
+    profiler = None
+    if mode == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+    elif mode == "collapsed":
+        profiler = StackProfiler()
+
+    output = output or default_outputs[mode]
+    atexit.register(report, mode, output, profiler)
+    if profiler is not None:
+        profiler.enable()
+
+    enabled = True
+
+# Enable the profiling if asked by the TETRIS_PROFILE environment variable
+# The file written can be given by TETRIS_PROFILE_OUTPUT
+def enable_from_env() -> None:
+    mode = os.environ.get("TETRIS_PROFILE", "")
+    if mode:
+        enable(mode, os.environ.get("TETRIS_PROFILE_OUTPUT", ""))
@@ -0,0 +1,196 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the frame renderer of the game.
+# Instead of clearing the screen with the "clear"/"cls" command and printing
+# every cell one by one, the whole frame (score, board and blocks) is put
+# together in a single string, and written at once after the ANSI sequences
+# moving the cursor home and clearing the screen.
+# The "diff" renderer goes further : it remembers the last frame drawn, and
+# only moves the cursor to the cells that changed to draw them again.
+# The old way of printing (print_score, print_grid and print_blocs in board.py)
+# is still used when "renderer" is set to "legacy".
+
+import os
+import sys
+from math import ceil
+from shutil import get_terminal_size
+
+from block_catalog import catalog
+from coords import label, label_width, column_header
+
+# ANSI sequence moving the cursor to the top-left corner and clearing the screen
+CLEAR_SEQUENCE = "\033[H\033[2J"
+
+# Renderer used to print the game : "frame", "diff" or "legacy"
+# Can be set with the TETRIS_RENDER environment variable
+renderers = ("frame", "diff", "legacy")
+renderer = os.environ.get("TETRIS_RENDER", "frame")
+
+# Show the valid origins of the block chosen by the player on the board
+# Can be enabled with the TETRIS_HINTS environment variable
+hints = os.environ.get("TETRIS_HINTS", "") not in ("", "0")
+
+# Old Windows consoles only understand ANSI sequences once this is done
+if os.name == "nt":
+    os.system("")
+
+# Glyph of each type of cell
+# '3' and '4' are only used by the hints : valid origins on an empty cell and on a full cell
+glyphs = {'0': "  ", '1': "· ", '2': "■ ", '3': "○ ", '4': "● "}
+
+# Return the board with the valid origins of a block marked on it (see glyphs)
+# "origins" has one bitmask of the valid x per row, as returned by moves.legal_origins
+# Only the rows having a valid origin are copied
+def hint_grid(grid, origins) -> list:
+    marked = []
+    for line, mask in zip(grid, origins):
+        if mask:
+            line = line[:]
+            while mask:
+                low = mask & -mask
+                j = low.bit_length() - 1
+                line[j] = '4' if line[j] == '2' else '3'
+                mask ^= low
+        marked.append(line)
+
+    return marked
+
+# Return the score, as printed by print_score
+def score_text(score) -> str:
+    return f"""  ╔═══════════════════════════════════════╗
+  ║  SCORE : {score:<29}║
+  ╚═══════════════════════════════════════╝
+    
+"""
+
+# Return the board, as printed by print_grid
+def grid_text(grid) -> str:
+    nb_col = len(grid[0])
+    width = label_width(len(grid))
+
+    parts = [line + "\n" for line in column_header(nb_col, " " * (width+3))]
+    parts.append(" " * width + " ╔═" + "══" * nb_col + "╗\n")
+
+    for i, line in enumerate(grid):
+        parts.append(label(i, True).rjust(width) + " ║ ")
+        parts.extend(glyphs.get(c, "") for c in line)
+        parts.append("║\n")
+
+    parts.append(" " * width + " ╚═" + "══" * nb_col + "╝\n")
+    return "".join(parts)
+
+# Return the available blocks, as printed by print_blocs
+def blocs_text(blocs, pol) -> str:
+    if pol == 2 :
+        len_line = 3
+    else:
+        len_line = 10
+
+    parts = []
+    for az in range(ceil(len(blocs)/len_line)):
+        for row in range(5):
+            for bloc in blocs[len_line*az: len_line*(az+1)]:
+                parts.append(catalog[bloc].lines[row] + "   ")
+            parts.append("\n")
+        parts.append("\n")
+
+        for n in range(len_line*az, len_line*(az+1)):
+            parts.append("{:<13d}".format(n+1))
+        parts.append("\n\n")
+
+    return "".join(parts)
+
+# Return a whole frame of the game, starting with the sequence clearing the screen
+def frame_text(score, grid, blocs, pol) -> str:
+    return CLEAR_SEQUENCE + score_text(score) + grid_text(grid) + blocs_text(blocs, pol)
+
+# Write a whole frame of the game to the terminal, with a single write
+# Return the number of characters written
+def draw_frame(score, grid, blocs, pol) -> int:
+    frame = frame_text(score, grid, blocs, pol)
+    sys.stdout.write(frame)
+    sys.stdout.flush()
+    return len(frame)
+
+# Return the ANSI sequence moving the cursor to a line and column (starting at 1)
+def move_to(line, col) -> str:
+    return f"\033[{line};{col}H"
+
+# Screen lines before the first row of the board : 4 for the score,
+# 1 for the letters of the columns and 1 for the top border
+# On boards of more than 26 columns, the letters of the columns take more lines
+GRID_TOP = 7
+
+# Return the screen line of the first row, and the screen column of the
+# first column of a board of nb_row x nb_col cells (starting at 1)
+def grid_origin(nb_row, nb_col) -> tuple:
+    return GRID_TOP + label_width(nb_col) - 1, label_width(nb_row) + 4
+
+class DiffRenderer:
+    def __init__(self):
+        self.reset()
+
+    # Forget the last frame, so that the next one is drawn entirely
+    # Must be called when something else was printed over the game
+    def reset(self) -> None:
+        self.score = None
+        self.grid = None
+        self.blocs = None
+        self.pol = None
+        self.blocs_height = 0
+
+    # Draw a frame of the game, only writing what changed since the last one
+    # Return the number of characters written
+    def draw(self, score, grid, blocs, pol) -> int:
+        nb_row = len(grid)
+        top, left = grid_origin(nb_row, len(grid[0]))
+        blocs_line = top + nb_row + 1
+
+        full = (self.grid is None
+                or len(self.grid) != nb_row or len(self.grid[0]) != len(grid[0])
+                or blocs_line + self.blocs_height > get_terminal_size().lines)
+
+        if full:
+            text = blocs_text(blocs, pol)
+            frame = CLEAR_SEQUENCE + score_text(score) + grid_text(grid) + text
+            self.blocs_height = text.count("\n")
+        else:
+            parts = []
+            if score != self.score:
+                parts.append(move_to(2, 1) + f"  ║  SCORE : {score:<29}║")
+
+            for i, line in enumerate(grid):
+                old = self.grid[i]
+                if line == old:
+                    continue
+                for j, c in enumerate(line):
+                    if c != old[j]:
+                        parts.append(move_to(top+i, left+2*j) + glyphs[c][0])
+
+            # The blocks are drawn again if they changed, and everything printed
+            # under them (the prompts of the last turn) is cleared
+            if blocs != self.blocs or pol != self.pol:
+                text = blocs_text(blocs, pol)
+                parts.append(move_to(blocs_line, 1) + "\033[J" + text)
+                self.blocs_height = text.count("\n")
+            else:
+                parts.append(move_to(blocs_line + self.blocs_height, 1) + "\033[J")
+            frame = "".join(parts)
+
+        self.score = score
+        self.grid = [line[:] for line in grid]
+        self.blocs = blocs[:]
+        self.pol = pol
+
+        sys.stdout.write(frame)
+        sys.stdout.flush()
+        return len(frame)
+
+# Renderer used when "renderer" is "diff"
+diff_renderer = DiffRenderer()
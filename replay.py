@@ -0,0 +1,132 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file replays recorded games (journals, see journal.py) to check them.
+# Every move is played again from the start, without printing anything :
+# each one must be possible, every snapshot must match the game, and the
+# final score must be the one written at the end of the journal.
+# Journals given as a folder are all replayed, on several processes.
+#
+# e.g. : py replay.py save.journal
+#        py replay.py records/ --processes 4
+
+import argparse
+import os
+import sys
+import time
+from glob import glob
+from multiprocessing import Pool
+
+from board_cache import load_board
+from engine import GameState
+from journal import read_records, header_blocs
+
+# Replay a journal and check it
+# "task" is a tuple (path, engine)
+# Return a dictionary containing the result : "ok" is False if the game
+# couldn't be replayed, and "error" tells why
+def verify_journal(task) -> dict:
+    path, engine = task
+    result = {"path": path, "ok": False, "turns": 0, "score": 0, "error": ""}
+
+    try:
+        records = read_records(path)
+    except OSError as error:
+        result["error"] = str(error)
+        return result
+
+    if not records or records[0]["type"] != "game":
+        result["error"] = "no game header"
+        return result
+
+    header = records[0]
+    data = load_board(header["board"])
+    if data is None or data.nb_row == 0:
+        result["error"] = f"no board at {header['board']}"
+        return result
+
+    bloc_list, blocs = header_blocs(header)
+    state = GameState(data, bloc_list, header["pol"], header["seed"], engine)
+
+    for i, record in enumerate(records[1:], 2):
+        if record["type"] == "move":
+            if state.play(blocs.get(record["bloc"], -1), record["x"], record["y"]) < 0:
+                result["error"] = f"line {i} : illegal move on turn {state.turn}"
+                break
+
+        elif record["type"] == "snapshot":
+            if dict(state.snapshot(), type="snapshot") != record:
+                result["error"] = f"line {i} : snapshot of turn {record['turn']} doesn't match"
+                break
+
+        elif record["type"] == "end":
+            if record["score"] != state.score or record["turn"] != state.turn:
+                result["error"] = f"line {i} : final score {record['score']} instead of {state.score}"
+            break
+
+    result["turns"] = state.turn
+    result["score"] = state.score
+    result["ok"] = result["error"] == ""
+    return result
+
+# Return the paths of the journals to replay
+# "paths" contains files and folders, every .journal file of a folder is used
+def find_journals(paths) -> list:
+    journals = []
+    for path in paths:
+        if os.path.isdir(path):
+            journals.extend(sorted(glob(os.path.join(path, "*.journal"))))
+        else:
+            journals.append(path)
+
+    return journals
+
+# Print the results of the replays as they come
+# "quiet" only prints the games that failed
+# Return a tuple (number of games that failed, number of moves replayed)
+def print_results(results, quiet) -> tuple:
+    failed = 0
+    moves = 0
+    for result in results:
+        moves += result["turns"]
+        if not result["ok"]:
+            failed += 1
+            print(f"FAILED {result['path']} : {result['error']}")
+        elif not quiet:
+            print(f"OK     {result['path']} : score {result['score']} in {result['turns']} turns")
+
+    return failed, moves
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded games to check them.")
+    parser.add_argument("paths", nargs="+", help="journals, or folders containing journals")
+    parser.add_argument("--engine", default="bitboard")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--quiet", action="store_true", help="only print the games that failed")
+    args = parser.parse_args()
+
+    tasks = [(path, args.engine) for path in find_journals(args.paths)]
+    if not tasks:
+        print("No journal to replay.")
+        return 1
+
+    start = time.perf_counter()
+    if args.processes == 1:
+        failed, moves = print_results(map(verify_journal, tasks), args.quiet)
+    else:
+        with Pool(args.processes) as pool:
+            chunksize = max(1, len(tasks) // (args.processes * 16))
+            failed, moves = print_results(pool.imap_unordered(verify_journal, tasks, chunksize), args.quiet)
+    duration = time.perf_counter() - start
+
+    print(f"\n{len(tasks)} games replayed, {failed} failed, in {duration:.2f}s : "
+          f"{len(tasks) / duration:.1f} games/sec, {moves / duration:.0f} moves/sec")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,393 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the game server, hosting many games at once.
+# Each game is a session, played on a GameState (see engine.py) and kept in
+# memory until it is closed. A session belongs to the connection that started
+# (or resumed) it : only this connection can play it, and it is closed when
+# the connection is.
+# Clients connect on localhost (TCP or Unix socket), and send one JSON
+# request per line. The server answers each of them with one JSON line :
+#
+#   {"op": "new", "board": "circle", "pol": 2}
+#   {"op": "state", "session": 1}
+#   {"op": "place", "session": 1, "bloc": 2, "coord": "aB"}   (or "x" and "y")
+#   {"op": "hints", "session": 1, "bloc": 2}
+#   {"op": "save", "session": 1, "name": "save"}
+#   {"op": "resume", "name": "save"}
+#   {"op": "saved", "name": "save"}
+#   {"op": "close", "session": 1}
+#   {"op": "stats"}
+#
+# The answers contain "ok" (and "error" if it is false), the "id" of the
+# request if it had one, and the time spent on the request in "time_ms".
+# "bloc" is the number of the block in the hand, starting at 1, as typed in
+# the terminal game. The blocks of the hand are given by their cells, as the
+# client can have them at other indexes in its catalog.
+# The time spent on each type of request is kept, and can be asked with
+# "stats". A summary is printed when the server stops.
+#
+# e.g. : py server.py --port 7420
+#        py server.py --unix /tmp/tetris.sock
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+
+from block_catalog import catalog, canonical_cells
+from board import engines, get_block_list
+from board_cache import load_board
+from coords import parse_coord
+from engine import GameState
+from journal import Journal, load_journal, read_records
+
+# Address the server listens on by default
+HOST = "127.0.0.1"
+PORT = 7420
+
+# Folder where the sessions are saved
+SAVE_DIR = "saves"
+
+# Folder of the boards the games can be played on
+BOARD_DIR = "board_shapes"
+
+# Maximum number of sessions kept at once
+MAX_SESSIONS = 100000
+
+# Engine of the new games, if the client doesn't choose one
+# The compact engine takes the least memory per game (see compact_board.py)
+ENGINE = "compact"
+
+# Error in a request, sent back to the client
+class RequestError(Exception):
+    pass
+
+# Time spent on a type of request
+# Only the last SAMPLES durations are kept to compute the percentiles
+class Latency:
+    SAMPLES = 1024
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=self.SAMPLES)
+
+    def add(self, seconds) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    # Return the number of requests, and the mean, median, 99th percentile
+    # and maximum durations in milliseconds
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"count": 0}
+
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1e3, 3),
+            "p50_ms": round(samples[len(samples) // 2] * 1e3, 3),
+            "p99_ms": round(samples[min(len(samples) - 1, len(samples) * 99 // 100)] * 1e3, 3),
+            "max_ms": round(self.max * 1e3, 3),
+        }
+
+# A game hosted by the server
+class Session:
+    __slots__ = ("state", "board_path")
+
+    def __init__(self, state, board_path):
+        self.state = state
+        self.board_path = board_path
+
+# Return the value of a field of a request
+# Raise a RequestError if it is missing or isn't of the type "kind"
+def field(request, name, kind):
+    value = request.get(name)
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise RequestError(f"The field \"{name}\" is missing or invalid.")
+
+    return value
+
+# Return the state of a game, as sent to the clients
+# The rows of the board are strings of '0', '1' and '2', as in the board files
+def state_dict(state) -> dict:
+    return {
+        "turn": state.turn,
+        "score": state.score,
+        "lines": state.lines,
+        "pol": state.pol,
+        "over": state.is_over(),
+        "hand": [canonical_cells(catalog[bloc].cells) for bloc in state.hand()],
+        "grid": ["".join(line) for line in state.grid()],
+    }
+
+class Server:
+    def __init__(self, save_dir=SAVE_DIR, max_sessions=MAX_SESSIONS):
+        self.save_dir = save_dir
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.next_session = 1
+        self.connections = 0
+        self.latency = {}
+
+    # Add a game to the sessions, owned by a connection
+    # "owned" is the set of the sessions of the connection
+    # Return the answer giving its number and its state
+    def add_session(self, state, board_path, owned) -> dict:
+        if len(self.sessions) >= self.max_sessions:
+            raise RequestError("Too many sessions.")
+
+        session = self.next_session
+        self.next_session += 1
+        self.sessions[session] = Session(state, board_path)
+        owned.add(session)
+        return {"session": session, "state": state_dict(state)}
+
+    # Return the session of a request
+    # The sessions of the other connections are never given
+    def session(self, request, owned) -> Session:
+        number = field(request, "session", int)
+        session = self.sessions.get(number)
+        if session is None or number not in owned:
+            raise RequestError("No such session.")
+
+        return session
+
+    # Return the block of the hand chosen in a request
+    def chosen_bloc(self, state, request) -> int:
+        choice = field(request, "bloc", int)
+        if not 1 <= choice <= len(state.hand()):
+            raise RequestError("No such block in the hand.")
+
+        return state.hand()[choice-1]
+
+    # Return the path of the save file of a request
+    def save_path(self, request) -> str:
+        name = request.get("name", "save")
+        if not isinstance(name, str) or not re.fullmatch(r"[\w-]{1,64}", name):
+            raise RequestError("Invalid save name.")
+
+        return os.path.join(self.save_dir, name + ".journal")
+
+    # Start a new game : "board" is the name of a board of BOARD_DIR (as typed
+    # in the board selection menu), "pol" the policy, and optionally "seed" and "engine"
+    def op_new(self, request, owned) -> dict:
+        name = field(request, "board", str)
+        pol = field(request, "pol", int) if "pol" in request else 2
+        engine = request.get("engine", ENGINE)
+        seed = field(request, "seed", int) if request.get("seed") is not None else None
+        if not re.fullmatch(r"[\w-]{1,64}", name):
+            raise RequestError("Invalid board name.")
+        if pol not in (1, 2):
+            raise RequestError("The policy must be 1 or 2.")
+        if engine not in engines:
+            raise RequestError(f"No engine named {engine}.")
+        if seed is not None and seed < 0:
+            raise RequestError("The seed must be a positive integer.")
+
+        path = os.path.join(BOARD_DIR, name + ".txt")
+        try:
+            data = load_board(path)
+        except (OSError, ValueError):
+            data = None
+        if data is None or data.nb_row == 0:
+            raise RequestError(f"No board named {name}.")
+
+        return self.add_session(GameState(data, get_block_list(path), pol, seed, engine), path, owned)
+
+    def op_state(self, request, owned) -> dict:
+        return {"state": state_dict(self.session(request, owned).state)}
+
+    # Place a block of the hand, at "coord" (as typed in the terminal game) or at "x" and "y"
+    # "gained" is -1 if the block can't be placed there
+    def op_place(self, request, owned) -> dict:
+        state = self.session(request, owned).state
+        bloc = self.chosen_bloc(state, request)
+        if "coord" in request:
+            coord = parse_coord(field(request, "coord", str), state.board.nb_col, state.board.nb_row)
+            if coord is None:
+                raise RequestError("Invalid coordinates.")
+            x, y = coord
+        else:
+            x, y = field(request, "x", int), field(request, "y", int)
+
+        gained = state.play(bloc, x, y)
+        if gained < 0:
+            return {"gained": gained}
+
+        return {"gained": gained, "state": state_dict(state)}
+
+    # Return the valid origins of a block of the hand, one hexadecimal bitmask per row
+    def op_hints(self, request, owned) -> dict:
+        state = self.session(request, owned).state
+        origins = state.origins(self.chosen_bloc(state, request))
+        return {"origins": [format(mask, 'x') for mask in origins]}
+
+    # Save a game as a journal holding only its last state (see journal.py)
+    def op_save(self, request, owned) -> dict:
+        session = self.session(request, owned)
+        path = self.save_path(request)
+        os.makedirs(self.save_dir, exist_ok=True)
+
+        journal = Journal(path)
+        journal.start(session.state, session.board_path)
+        journal.append(dict(session.state.snapshot(), type="snapshot"))
+        journal.close()
+        return {}
+
+    # Load a saved game in a new session
+    def op_resume(self, request, owned) -> dict:
+        path = self.save_path(request)
+        engine = request.get("engine")
+        if engine is not None and engine not in engines:
+            raise RequestError(f"No engine named {engine}.")
+        if not os.path.isfile(path):
+            raise RequestError("No such save.")
+
+        state = load_journal(path, engine)
+        if state is None:
+            raise RequestError("The saved game can't be loaded.")
+
+        return self.add_session(state, read_records(path)[0]["board"], owned)
+
+    # Tell if a game is saved under a name
+    def op_saved(self, request, owned) -> dict:
+        return {"saved": os.path.isfile(self.save_path(request))}
+
+    def op_close(self, request, owned) -> dict:
+        self.session(request, owned)
+        del self.sessions[request["session"]]
+        owned.discard(request["session"])
+        return {}
+
+    def op_stats(self, request, owned) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "connections": self.connections,
+            "latency": {op: latency.summary() for op, latency in sorted(self.latency.items())},
+        }
+
+    # Answer a line sent by a client
+    # "owned" is the set of the sessions of its connection
+    # Return the answer, as a dictionary
+    def respond(self, line, owned) -> dict:
+        start = time.perf_counter()
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = None
+
+        op = "invalid"
+        try:
+            if not isinstance(request, dict):
+                request = {}
+                raise RequestError("A request must be a JSON object.")
+            if request.get("op") not in operations:
+                raise RequestError(f"No operation named {request.get('op')}.")
+            op = request["op"]
+            answer = operations[op](self, request, owned)
+            answer["ok"] = True
+        except RequestError as error:
+            answer = {"ok": False, "error": str(error)}
+
+        elapsed = time.perf_counter() - start
+        self.latency.setdefault(op, Latency()).add(elapsed)
+        answer["time_ms"] = round(elapsed * 1e3, 3)
+        if "id" in request:
+            answer["id"] = request["id"]
+
+        return answer
+
+    # Answer the requests of a client, until it disconnects
+    # The sessions it didn't close are closed then, as no other connection can reach them
+    async def handle(self, reader, writer) -> None:
+        self.connections += 1
+        owned = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                answer = self.respond(line, owned)
+                writer.write(json.dumps(answer, separators=(',', ':')).encode() + b"\n")
+                await writer.drain()
+        # The connections still open are cancelled when the server stops
+        except (ConnectionError, ValueError, asyncio.CancelledError):
+            pass
+        finally:
+            self.connections -= 1
+            for session in owned:
+                del self.sessions[session]
+            writer.close()
+
+    # Return the summary of the time spent on the requests, as a table
+    def summary(self) -> str:
+        lines = [f"{'REQUEST':<10}{'COUNT':>10}{'MEAN (ms)':>12}{'P50 (ms)':>12}{'P99 (ms)':>12}{'MAX (ms)':>12}"]
+        for op, latency in sorted(self.latency.items()):
+            stats = latency.summary()
+            lines.append(f"{op:<10}{stats['count']:>10}{stats['mean_ms']:>12.3f}{stats['p50_ms']:>12.3f}"
+                         f"{stats['p99_ms']:>12.3f}{stats['max_ms']:>12.3f}")
+
+        return "\n".join(lines) + "\n"
+
+# Functions answering each operation, by name
+operations = {
+    "new": Server.op_new,
+    "state": Server.op_state,
+    "place": Server.op_place,
+    "hints": Server.op_hints,
+    "save": Server.op_save,
+    "resume": Server.op_resume,
+    "saved": Server.op_saved,
+    "close": Server.op_close,
+    "stats": Server.op_stats,
+}
+
+# Run the server until it is stopped
+# "unix" is the path of a Unix socket, if None the server listens on host:port
+async def serve(server, host=HOST, port=PORT, unix=None) -> None:
+    if unix is not None:
+        listener = await asyncio.start_unix_server(server.handle, unix, backlog=4096)
+        print(f"Listening on {unix}")
+    else:
+        listener = await asyncio.start_server(server.handle, host, port, backlog=4096)
+        print(f"Listening on {host}:{port}")
+    sys.stdout.flush()
+
+    async with listener:
+        await listener.serve_forever()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Host many games, played by clients on this computer.")
+    parser.add_argument("--host", default=HOST, choices=("127.0.0.1", "::1", "localhost"))
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", default=None, help="path of a Unix socket to listen on instead")
+    parser.add_argument("--saves", default=SAVE_DIR, help="folder where the games are saved")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    args = parser.parse_args()
+
+    server = Server(args.saves, args.max_sessions)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stderr.write("\n" + server.summary())
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file runs automated games on several processes, to gather the
+# distribution of the scores on each board and policy.
+# Each game is given by its board, policy and seed, and its result
+# (score, turns, lines cleared, duration) is written as soon as it finishes.
+# With all the blocks available (policy 1), a game can go on for a very long
+# time, so games are stopped after a maximum number of turns.
+#
+# e.g. : py simulate.py --games 1000 --policies 2 --output results.jsonl
+
+import argparse
+import csv
+import json
+import os
+import time
+from glob import glob
+from multiprocessing import Pool
+from random import Random
+
+from board import get_block_list
+from board_cache import load_board
+from bot import Bot
+from engine import GameState
+from journal import Journal
+
+# Players available, by name
+# A player is a function taking a GameState and a random.Random,
+# and returning the (bloc, x, y) move to play
+def random_player(state, rng) -> tuple:
+    moves = state.legal_moves()
+    return moves[rng.randrange(len(moves))]
+
+# Greedy bot, one per process so that its transposition table is kept between games
+bot = Bot()
+
+def bot_player(state, rng) -> tuple:
+    return bot.choose(state)
+
+players = {
+    "random": random_player,
+    "bot": bot_player,
+}
+
+# Play a whole game without any output
+# "task" is a tuple (path, pol, seed, engine, player, max_turns, record)
+# If "record" is a folder, the game is recorded there as a journal, that
+# can be checked with replay.py
+# Return a dictionary containing the result of the game, "over" being False
+# if the game was stopped after "max_turns" turns
+def play_game(task) -> dict:
+    path, pol, seed, engine, player, max_turns, record = task
+
+    start = time.perf_counter()
+    state = GameState(load_board(path), get_block_list(path), pol, seed, engine)
+    rng = Random(seed)
+    choose = players[player]
+
+    journal = None
+    if record is not None:
+        name = os.path.splitext(os.path.basename(path))[0]
+        journal = Journal(os.path.join(record, f"{name}-p{pol}-{seed}.journal"))
+        journal.start(state, path)
+
+    over = state.is_over()
+    while not over and state.turn < max_turns:
+        bloc, x, y = choose(state, rng)
+        state.play(bloc, x, y)
+        if journal is not None:
+            journal.record(state, bloc, x, y)
+        over = state.is_over()
+
+    if journal is not None:
+        journal.end(state)
+
+    return {
+        "board": path,
+        "pol": pol,
+        "seed": seed,
+        "score": state.score,
+        "turns": state.turn,
+        "lines": state.lines,
+        "over": over,
+        "duration": time.perf_counter() - start,
+    }
+
+# Write the results to a .jsonl or .csv file as they come
+# Return the list of results
+def write_results(results, path) -> list:
+    done = []
+    with open(path, 'w', newline='') as file:
+        writer = None
+        if path.endswith(".csv"):
+            writer = csv.DictWriter(file, ["board", "pol", "seed", "score", "turns", "lines", "over", "duration"])
+            writer.writeheader()
+
+        for result in results:
+            if writer is None:
+                file.write(json.dumps(result) + "\n")
+            else:
+                writer.writerow(result)
+            file.flush()
+            done.append(result)
+
+    return done
+
+# Print the score of every board and policy, and the number of games per second
+def print_summary(results, duration) -> None:
+    groups = {}
+    for result in results:
+        groups.setdefault((result["board"], result["pol"]), []).append(result["score"])
+
+    print(f"{'BOARD':<32}{'POL':>4}{'GAMES':>8}{'MIN':>8}{'MEAN':>10}{'MAX':>8}")
+    for (path, pol), scores in sorted(groups.items()):
+        mean = sum(scores) / len(scores)
+        print(f"{path:<32}{pol:>4}{len(scores):>8}{min(scores):>8}{mean:>10.1f}{max(scores):>8}")
+
+    print(f"\n{len(results)} games in {duration:.2f}s : {len(results) / duration:.1f} games/sec")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run automated games on several processes.")
+    parser.add_argument("--games", type=int, default=100, help="number of games per board and policy")
+    parser.add_argument("--boards", nargs="+", default=sorted(glob("board_shapes/*.txt")))
+    parser.add_argument("--policies", nargs="+", type=int, choices=(1, 2), default=[1, 2])
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--engine", default="bitboard")
+    parser.add_argument("--player", choices=list(players), default="random")
+    parser.add_argument("--max-turns", type=int, default=1000, help="turns after which a game is stopped")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default="results.jsonl", help=".jsonl or .csv file")
+    parser.add_argument("--record", default=None, help="folder where every game is recorded")
+    args = parser.parse_args()
+
+    if args.record is not None:
+        os.makedirs(args.record, exist_ok=True)
+
+    tasks = [(path, pol, args.seed + i, args.engine, args.player, args.max_turns, args.record)
+             for path in args.boards
+             for pol in args.policies
+             for i in range(args.games)]
+
+    start = time.perf_counter()
+    with Pool(args.processes) as pool:
+        chunksize = max(1, len(tasks) // (args.processes * 16))
+        results = write_results(pool.imap_unordered(play_game, tasks, chunksize), args.output)
+    duration = time.perf_counter() - start
+
+    print_summary(results, duration)
+    return 0
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the sparse engine of the game, made for boards with a
+# lot of void cells ('0'), like rings or big custom shapes.
+# Only the playable cells are stored :
+#   - "row_cells[i]" is the sorted array of the columns of the playable cells of row i
+#   - "row_filled[i]" has one byte per playable cell of row i, 1 if it is filled
+#   - "col_cells[j]" is the sorted array of the rows of the playable cells of column j
+# The memory used and the time spent scanning the board then depend on the
+# number of playable cells, and not on the size of the rectangle around them.
+# Like the grid engine, the number of filled cells of every line is kept up to
+# date, so that only the lines that changed are checked for completion.
+
+from array import array
+from bisect import bisect_left
+
+from block_catalog import catalog
+from board_cache import compile_board
+
+class SparseBoard:
+    # Create a sparse board from a 2D matrix of the board
+    def __init__(self, grid):
+        self.setup(compile_board(grid))
+
+    # Create a sparse board from the data of a board file (see board_cache.py)
+    # Return the sparse board
+    @classmethod
+    def from_data(cls, data):
+        board = cls.__new__(cls)
+        board.setup(data)
+        return board
+
+    # Set every attribute of the sparse board from the data of the board
+    # Only the playable cells are gone through, from the bitmasks of the rows
+    def setup(self, data) -> None:
+        self.nb_row = data.nb_row
+        self.nb_col = data.nb_col
+
+        self.row_cells = []
+        self.row_filled = []
+        self.col_cells = [array('I') for j in range(self.nb_col)]
+        for i, (p, f) in enumerate(zip(data.playable, data.filled)):
+            cells = array('I')
+            filled = bytearray()
+            while p:
+                low = p & -p
+                j = low.bit_length() - 1
+                cells.append(j)
+                filled.append(1 if f & low else 0)
+                self.col_cells[j].append(i)
+                p ^= low
+            self.row_cells.append(cells)
+            self.row_filled.append(filled)
+
+        # A row with the same playable cells as the row above it can fall as a whole
+        self.same_shape = [i > 0 and self.row_cells[i] == self.row_cells[i-1] for i in range(self.nb_row)]
+
+        # Number of filled cells in each row and column
+        self.row_count = [filled.count(1) for filled in self.row_filled]
+        self.col_count = [0] * self.nb_col
+        for cells, filled in zip(self.row_cells, self.row_filled):
+            for j, f in zip(cells, filled):
+                self.col_count[j] += f
+
+        # Number of lines cleared since the board was created
+        self.cleared = 0
+
+        # Lines that changed since the last call to clear_rows_and_col
+        self.dirty_rows = set(range(self.nb_row))
+        self.dirty_cols = set(range(self.nb_col))
+
+    # Return the index of the cell of column j in row i, or -1 if it isn't playable
+    def index(self, i, j) -> int:
+        cells = self.row_cells[i]
+        k = bisect_left(cells, j)
+        if k < len(cells) and cells[k] == j:
+            return k
+        return -1
+
+    def to_grid(self) -> list:
+        grid = []
+        for cells, filled in zip(self.row_cells, self.row_filled):
+            line = ['0'] * self.nb_col
+            for j, f in zip(cells, filled):
+                line[j] = '2' if f else '1'
+            grid.append(line)
+
+        return grid
+
+    # Return a list containing, for every row, the bitmask of its free cells
+    def free_rows(self) -> list:
+        free = []
+        for cells, filled in zip(self.row_cells, self.row_filled):
+            mask = 0
+            for j, f in zip(cells, filled):
+                if not f:
+                    mask |= 1 << j
+            free.append(mask)
+
+        return free
+
+    # Check if the block at index "bloc" can be placed at an (x,y) location
+    # (x,y) refers to the bottom-left corner of the block
+    # Return True if the block can be placed, False otherwise
+    def valid_position(self, bloc, x, y) -> bool:
+        if x < 0 or y < 0 or x >= self.nb_col or y >= self.nb_row:
+            return False
+
+        for dy, dx in catalog[bloc].cells:
+            i = y - dy
+            if i < 0:
+                return False
+            k = self.index(i, x + dx)
+            if k < 0 or self.row_filled[i][k]:
+                return False
+
+        return True
+
+    # Place the block at index "bloc" at an (x,y) location
+    # NOTE: The position must have been checked with valid_position
+    def place_bloc(self, bloc, x, y) -> None:
+        for dy, dx in catalog[bloc].cells:
+            i, j = y - dy, x + dx
+            self.row_filled[i][self.index(i, j)] = 1
+            self.row_count[i] += 1
+            self.col_count[j] += 1
+            self.dirty_rows.add(i)
+            self.dirty_cols.add(j)
+
+    # Make the rows above the row at index i fall down 1 row
+    # A cell only falls if the cell under it is playable
+    # NOTE: The counters of filled cells aren't updated, see clear_rows_and_col
+    def make_bloc_fall(self, i) -> None:
+        for r in range(i, 0, -1):
+            if self.same_shape[r]:
+                self.row_filled[r] = self.row_filled[r-1]
+                continue
+
+            # Go through the playable cells of both rows at once
+            cells, above = self.row_cells[r], self.row_cells[r-1]
+            filled, above_filled = bytearray(len(cells)), self.row_filled[r-1]
+            k = 0
+            for n, j in enumerate(cells):
+                while k < len(above) and above[k] < j:
+                    k += 1
+                if k < len(above) and above[k] == j:
+                    filled[n] = above_filled[k]
+            self.row_filled[r] = filled
+
+        self.row_filled[0] = bytearray(len(self.row_cells[0]))
+
+    # Check if any row and column are completed. If it is the case, clear them
+    # Only the lines that changed since the last call are checked
+    # A line without any playable cell is never completed
+    # Return the score gained
+    def clear_rows_and_col(self) -> int:
+        full_rows = sorted(i for i in self.dirty_rows
+                           if self.row_cells[i] and self.row_count[i] == len(self.row_cells[i]))
+        full_cols = sorted(j for j in self.dirty_cols
+                           if self.col_cells[j] and self.col_count[j] == len(self.col_cells[j]))
+        self.dirty_rows = set()
+        self.dirty_cols = set()
+        self.cleared += len(full_rows) + len(full_cols)
+        score = 0
+
+        if full_rows:
+            # Only the rows above the lowest cleared row move, so only their
+            # cells are counted again
+            lowest = full_rows[-1]
+            for i in range(lowest+1):
+                for j, f in zip(self.row_cells[i], self.row_filled[i]):
+                    self.col_count[j] -= f
+
+            for i in full_rows:
+                self.make_bloc_fall(i)
+                score += len(self.row_cells[i])
+
+            for i in range(lowest+1):
+                count = self.row_filled[i].count(1)
+                if count != self.row_count[i] or i in full_rows:
+                    self.row_count[i] = count
+                    self.dirty_rows.add(i)
+                for j, f in zip(self.row_cells[i], self.row_filled[i]):
+                    if f:
+                        self.col_count[j] += 1
+                        self.dirty_cols.add(j)
+
+        for j in full_cols:
+            for i in self.col_cells[j]:
+                k = self.index(i, j)
+                if self.row_filled[i][k]:
+                    self.row_filled[i][k] = 0
+                    self.row_count[i] -= 1
+            self.col_count[j] = 0
+            score += len(self.col_cells[j])
+
+        return score
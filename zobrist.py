@@ -0,0 +1,52 @@
+###########################################
+#                                         #
+#   Python Project : A Tetris-Like Game   #
+#   MEUNIER Antoine, BUDAR Maxime         #
+#   EFREI, 2022                           #
+#                                         #
+###########################################
+
+# This file contains the Zobrist hashing of the boards.
+# Every cell of a board has a random 64-bit key, and the hash of a board is
+# the XOR of the keys of its filled cells. Filling or emptying a cell is then
+# a single XOR, so the hash can be kept up to date with every move.
+# The keys only depend on the size of the board, so boards of the same
+# size can be compared with their hashes.
+
+from random import Random
+from struct import unpack
+
+# Keys already generated, by size of board
+tables = {}
+
+# Return the keys of a board of a given size
+# keys[i][j] is the key of the cell at row i and column j
+def zobrist_keys(nb_row, nb_col) -> list:
+    if (nb_row, nb_col) not in tables:
+        rng = Random((nb_row << 32) | nb_col)
+        tables[(nb_row, nb_col)] = [list(unpack(f"<{nb_col}Q", rng.randbytes(8 * nb_col)))
+                                    for i in range(nb_row)]
+
+    return tables[(nb_row, nb_col)]
+
+# XOR the keys of the cells of a row given by a bitmask
+# Return the new hash
+def xor_row(h, keys_row, mask) -> int:
+    while mask:
+        low = mask & -mask
+        h ^= keys_row[low.bit_length()-1]
+        mask ^= low
+
+    return h
+
+# Compute the hash of a 2D matrix of the board, without any board engine
+# Return the hash, a 64-bit integer
+def grid_hash(grid) -> int:
+    keys = zobrist_keys(len(grid), len(grid[0]) if grid else 0)
+    h = 0
+    for i, line in enumerate(grid):
+        for j, cell in enumerate(line):
+            if cell == '2':
+                h ^= keys[i][j]
+
+    return h